@@ -8,6 +8,8 @@ sys.path.append(str(Path(__file__).parent))
 
 from typing import Union, List, Tuple, Optional
 from collections import Counter
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
 
 from psychopy.clock import CountdownTimer
 import time
@@ -23,9 +25,11 @@ from utils.params import (
 )
 
 from utils.quest_controller import QuestController
-from utils.responses_nidaqmx import NIResponsePad
-from utils.triggers_nidaqmx import setParallelData, close_tasks
-from utils.fixation_display import FixationDisplay
+from utils.SGC_group import SGCConnectorGroup
+from utils.intensity_scheduler import IntensityScheduler
+from utils.responses_nidaqmx import make_response_pad
+from utils.triggers_nidaqmx import setParallelData, close_tasks, export_mock_triggers, USE_NIDAQ
+from utils.display_backends import make_display
 import signal
 
 
@@ -37,6 +41,14 @@ import signal
 OUTPUT_PATH = Path(__file__).parent / "output" 
 OUTPUT_PATH.mkdir(exist_ok=True, parents=True)
 
+PHOTODIODE = False  # flip a patch in the bottom-left corner of the screen on every display change
+
+
+
+def practice_quest_state_path(participant_id):
+    """QUEST state written by PracticeBreathingCerebellOPM.py for this participant."""
+    return OUTPUT_PATH / f"sub-{participant_id}_practice_quest-state.bin"
+
 
 def create_trigger_mapping( stim = 1, target = 2, middle = 4, index = 8,response = 16, correct = 32, incorrect = 64):
     trigger_mapping = {
@@ -127,6 +139,8 @@ class MiddleIndexTactileDiscriminationTask:
         self.trigger_mapping = trigger_mapping
         self.send_trigger = send_trigger
         self.SGC_connectors = SGC_connectors
+        self.SGC_group = SGCConnectorGroup(SGC_connectors) if SGC_connectors else None
+        self.scheduler = IntensityScheduler(SGC_connectors) if SGC_connectors else None
         self.salient_intensity = salient_intensity
 
         self.countdown_timer = CountdownTimer() 
@@ -136,7 +150,7 @@ class MiddleIndexTactileDiscriminationTask:
         self.target_2 = target_2
 
 
-        self.listener = NIResponsePad(
+        self.listener = make_response_pad(
             device="Dev1",
             port="port6",
             num_lines=2,
@@ -157,14 +171,14 @@ class MiddleIndexTactileDiscriminationTask:
         
         
         self.QUEST = quest_controller        
-        self.display = FixationDisplay(screen_index=0) 
+        self.display = make_display(screen_index=0, photodiode=PHOTODIODE) 
     
         self.practice_mode = practice_mode    
         
         self.start_time = time.perf_counter()
 
     def show_fixation(self, color="white"):
-        self.display.show_fixation(color=color)
+        return self.display.show_fixation(color=color)
 
     def setup_experiment(self):
         logged_block_idx = 0
@@ -285,6 +299,10 @@ class MiddleIndexTactileDiscriminationTask:
         total_breaks = events.count("break")
         n_breaks_done = 0
 
+        # plan all intensity changes for the events ahead of time
+        if self.scheduler:
+            self.scheduler.make_plan(events)
+
 
         for i, trial in enumerate(events):
             if trial == "break":
@@ -308,10 +326,11 @@ class MiddleIndexTactileDiscriminationTask:
             else:
                 intensity = self.QUEST.current_intensity
 
+            cue_onset = None
             if "target" in event_type:
-                self.listener.reset_response()
+                response_window_start = time.perf_counter()  # presses before this belong to earlier events
                 if self.practice_mode:
-                    self.show_fixation(color="green")
+                    cue_onset = self.show_fixation(color="green")
                 response_given = False
             else:
                 self.show_fixation()
@@ -336,64 +355,86 @@ class MiddleIndexTactileDiscriminationTask:
             print(f"Event: {event_type}, intensity: {intensity}")
 
             target_time = stim_time + trial["ISI"]
+            deadline = self.start_time + target_time  # perf_counter time the next stimulus is due
             response_given = False # to keep track of whether a response has been given
 
-            try: 
-                self.prepare_for_next_stimulus(event_type, events[i+1]["event"])
-            except IndexError:
-                pass
-            except TypeError: # if break is coming up next
-                try:
-                    self.prepare_for_next_stimulus(event_type, events[i+2]["event"])
-                except IndexError:
-                    pass
+            self.prepare_for_next_stimulus(i, events, deadline=deadline)
 
             if trial["reset_QUEST"]:
                 self.QUEST.reset(verbose=True)
+
+            # both possible QUEST updates, so the response only has to pick one
+            if "target" in event_type:
+                self.QUEST.speculate(intensity)
         
-            
-            while (time.perf_counter() - self.start_time) < target_time:
-                # check for key press during target window
-                if "target" in event_type and not response_given:
-                    rt:Union[float, str] = "NA"
-                    key = self.listener.get_response()
-                    if key:
-                        correct, response_trigger = self.correct_or_incorrect(key, event_type)
-                        time_of_response = (time.perf_counter() - self.start_time)
+            # wait for a key press during the target window, without spinning on the CPU
+            if "target" in event_type:
+                rt:Union[float, str] = "NA"
+                press = self.listener.wait_for_response(deadline=deadline - SPIN_BEFORE_STIMULUS_S, after=response_window_start)
+                if press is None:
+                    # spin through the rest of the window; a press in its last ms still counts
+                    wait_until(deadline)
+                    press = self.listener.first_press_after(response_window_start)
+                if press:
+                    key = press.label
+                    correct, response_trigger = self.correct_or_incorrect(key, event_type)
+                    time_of_response = press.rise_time - self.start_time  # timestamped by the response pad thread
+                    
+                    self.raise_and_lower_trigger(response_trigger)
+
+                    
+
+                    print(f"Response: {key}, Correct: {correct}")
+                    
+                    rt = time_of_response - stim_time
+                    response_given = True
                         
-                        self.raise_and_lower_trigger(response_trigger)
-
+                    # overwrite event type for logging
+                    trial["event"] = "response"
+                    
+                    self.log_event(
+                        **trial,
+                        time=time_of_response,
+                        intensity="NA",
+                        trigger=response_trigger,
+                        correct=correct,
+                        rt=rt,
+                        log_file=log_file
+                    )
                         
 
-                        print(f"Response: {key}, Correct: {correct}")
-                        
-                        rt = time_of_response - stim_time
-                        response_given = True
-                            
-                        # overwrite event type for logging
-                        trial["event"] = "response"
-                        
-                        self.log_event(
-                            **trial,
-                            time=time_of_response,
-                            intensity="NA",
-                            trigger=response_trigger,
-                            correct=correct,
-                            rt=rt,
-                            log_file=log_file
-                        )
-                            
-
-                        self.QUEST.add_response(correct, intensity=intensity)
+                    self.QUEST.add_response(correct, intensity=intensity)
 
             if ("target" in event_type) and (not response_given):
                 print("No response given")
                 # Update QUEST with the guessed outcome and advance intensity
                 self.QUEST.add_response(np.random.choice([0, 1]), intensity=intensity)
 
+            if cue_onset is not None:
+                self.log_display_onset(cue_onset, trial, event="fixation/green", log_file=log_file)
+
+            # sleep until the next stimulus is due
+            wait_until(deadline)
+
         # change fixation back to white at the end of the block
         self.show_fixation(color="white") 
 
+    def log_display_onset(self, onset, trial, event, log_file=None):
+        """
+        Log when a display change reached the screen (onset: a Future from the display server, or a time).
+        Logged as NA if the display did not report an onset in time.
+        """
+        if log_file:
+            try:
+                onset_time = onset.result(timeout=0.1) if hasattr(onset, "result") else onset
+            except FutureTimeoutError:
+                print(f"[DISPLAY] No onset for {event} within 100 ms")
+                onset_time = None
+            except Exception as e:
+                print(f"[DISPLAY] No onset for {event}: {e}")
+                onset_time = None
+            self.log_event(**{**trial, "event": event}, time="NA" if onset_time is None else onset_time - self.start_time, log_file=log_file)
+
     def log_event(self, time="NA", block="NA", ISI="NA", intensity="NA", event="NA", trigger="NA", n_in_block="NA", correct="NA", reset_QUEST="NA", rt="NA", log_file=None):
         if log_file:
             log_file.write(f"{time},{block},{ISI},{intensity},{event},{trigger},{n_in_block},{correct},{reset_QUEST},{rt}\n")
@@ -472,22 +513,26 @@ class MiddleIndexTactileDiscriminationTask:
 
     def deliver_stimulus(self, event_type):
         if self.SGC_connectors:
-            if "salient" in event_type:  # send to both fingers
-                for connector in self.SGC_connectors.values():
-                    connector.send_pulse()
+            if "salient" in event_type:  # send to both fingers simultaneously
+                self.SGC_group.fire_all()
             elif self.SGC_connectors and "target" in event_type: # send to the finger specified in the event type
                 self.SGC_connectors[event_type.split("/")[-1]].send_pulse()
 
-    def prepare_for_next_stimulus(self, event_type, next_event_type):
-        if self.SGC_connectors:
-            # after sending the trigger for the weak target stimulation change the intensity to the salient intensity
-            if "target" in event_type: 
-                self.SGC_connectors[event_type.split("/")[-1]].change_intensity(self.salient_intensity)
-
-            # check if next stimuli is weak, then lower based on which!
-            if "target" in next_event_type:
-                weak = self.QUEST.next_intensity()
-                self.SGC_connectors[next_event_type.split("/")[-1]].change_intensity(weak)
+    def prepare_for_next_stimulus(self, event_idx, events, deadline):
+        """
+        Issue the intensity changes planned by the scheduler for after this event: back to salient
+        after a weak target, and down to the QUEST intensity if the next stimulus is a target.
+        """
+        if self.scheduler:
+            # no time constraint if a break is coming up next
+            if event_idx + 1 < len(events) and events[event_idx + 1] == "break":
+                deadline = None
+
+            self.scheduler.after_pulse(
+                event_idx,
+                deadline=deadline,
+                resolve=lambda kind: self.salient_intensity if kind == "salient" else self.QUEST.next_intensity(),
+            )
 
     def trial_block(self, ISI=1.5, n_sequences=None):
 
@@ -581,6 +626,21 @@ def generate_block_order(ISIs: List[float], n_repeats: int) -> List[int]:
 
 # UTILITIES
 # -------------
+SPIN_BEFORE_STIMULUS_S = 0.002  # busy-wait only for the last 2 ms before a stimulus
+
+
+def wait_until(t: float, spin_s: float = SPIN_BEFORE_STIMULUS_S):
+    """
+    Wait until perf_counter time t: sleep until spin_s before t, then busy-wait
+    for the rest (time.sleep alone can overshoot by milliseconds).
+    """
+    remaining = t - time.perf_counter() - spin_s
+    if remaining > 0:
+        time.sleep(remaining)
+    while time.perf_counter() < t:
+        pass
+
+
 def build_block_order(
     wanted_transitions: List[Tuple[int, int]],
     start_blocks: Optional[List[int]] = None
@@ -705,6 +765,32 @@ def get_participant_info():
     return pid, {"salient": salient, "weak": weak}
 
 
+def make_quest_controller(participant_id, start_intensities):
+    """
+    QUEST for the main run, checkpointed after every trial. Offers to resume from this
+    participant's checkpoint (after a crash) or to start from the practice estimate.
+    """
+    checkpoint = OUTPUT_PATH / f"sub-{participant_id}_quest-state.bin"
+    max_weak = start_intensities["salient"] - DIFF_SALIENT_WEAK
+
+    for path, question in ((checkpoint, "Resume QUEST from the interrupted session"), (practice_quest_state_path(participant_id), "Start QUEST from the practice estimate")):
+        if not path.exists():
+            continue
+        saved = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
+        if input(f"{question} ({path.name}, saved {saved})? (y/n): ").strip().lower() == "y":
+            quest_controller = QuestController.load(path, checkpoint_path=checkpoint)
+            quest_controller.update_max_weak(max_weak)
+            print(f"QUEST restored after {quest_controller.n_trials} trials and {quest_controller.n_resets} resets, current intensity {quest_controller.current_intensity}")
+            return quest_controller
+
+    return QuestController(
+        start_val=start_intensities["weak"],
+        max_weak=max_weak,
+        target=0.75,
+        checkpoint_path=checkpoint,
+    )
+
+
 # specify what happens if the script is interrupted during the experiment (e.g., by pressing Ctrl+C)
 
 
@@ -733,11 +819,7 @@ if __name__ == "__main__":
 
     order = generate_block_order(ISIs=ISIS, n_repeats=N_REPEATS_BLOCKS)
 
-    quest_controller = QuestController(
-        start_val=start_intensities["weak"],
-        max_weak=start_intensities["salient"] - DIFF_SALIENT_WEAK,
-        target=0.75
-    )
+    quest_controller = make_quest_controller(participant_id, start_intensities)
 
     experiment = MiddleIndexTactileDiscriminationTask(
         send_trigger=True,
@@ -759,5 +841,11 @@ if __name__ == "__main__":
     experiment.run()
 
 
+    # keep the simulated trigger sequence next to the behavioural log for comparison
+    if not USE_NIDAQ:
+        export_mock_triggers(logfile.with_name(logfile.stem + "_mock-triggers.csv"))
+    experiment.display.export_onsets(logfile.with_name(logfile.stem + "_display-onsets.csv"), start_time=experiment.start_time)
+
     # Close NI-DAQ tasks at the end of the experiment
+    experiment.listener.close()
     close_tasks()
\ No newline at end of file
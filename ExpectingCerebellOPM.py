@@ -11,14 +11,14 @@ from typing import Union
 import numpy as np
 import copy
 
-from utils.responses_nidaqmx import NIResponsePad
-from utils.triggers_nidaqmx import setParallelData, close_tasks
+from utils.responses_nidaqmx import make_response_pad
+from utils.triggers_nidaqmx import setParallelData, close_tasks, export_mock_triggers, USE_NIDAQ
 
 from psychopy.clock import CountdownTimer
 from psychopy.core import wait
 
 
-from utils.fixation_display import FixationDisplay
+from utils.display_backends import make_display
 
 from utils.params import (
     VALID_INTENSITIES, STIM_DURATION, 
@@ -35,6 +35,8 @@ OUTPATH = Path(__file__).parent / "output"
 if not OUTPATH.exists():
     OUTPATH.mkdir(parents=True, exist_ok=True)
 
+PHOTODIODE = False  # flip a patch in the bottom-left corner of the screen on every display change
+
 class ExpectationExperiment:
     LOGHEADER = "block,event,time,repeated,expected,response,rt,correct,intensity,trigger\n"
     def __init__(
@@ -88,7 +90,7 @@ class ExpectationExperiment:
         self.intensity = intensity
         self.start_time = time.perf_counter()
 
-        self.display = FixationDisplay(screen_index=0)
+        self.display = make_display(screen_index=0, photodiode=PHOTODIODE)
         self.break_message = 'Time for a break!'
         self.env_change_message = 'The statistical regularites between the first and the second stimulus may have changed now! Take a little break.'
         # Map lines to response labels used by the experiment.
@@ -97,7 +99,7 @@ class ExpectationExperiment:
             1: "y", # yellow
         }
         
-        self.listener = NIResponsePad(
+        self.listener = make_response_pad(
             device="Dev1",
             port="port6",
             num_lines=2,
@@ -256,16 +258,18 @@ class ExpectationExperiment:
                         block=i_block, event=event["second_label"], time=time_second, repeated=event["repeated"], expected=event["expected"], intensity=self.intensity, trigger=event["trigger_second"], log_file=log_file
                     )
 
-                    self.listener.reset_response()  # <- clear any lingering press from previous trial
+                    # presses before the second stimulus belong to the previous trial
+                    response_window_start = self.start_time + time_second
                     while True:
-                        candidate = self.listener.get_response()
+                        # blocks until a press arrives (re-checking every second so Ctrl+C still works)
+                        press = self.listener.wait_for_response(timeout=1.0, after=response_window_start)
                         # for testing without participant
                         # time.sleep(0.9)  # simulate response time
                         # candidate = np.random.choice(["b", "y"])
 
-                        if candidate:
-                            response = candidate
-                            time_of_response = time.perf_counter() - self.start_time
+                        if press:
+                            response = press.label
+                            time_of_response = press.rise_time - self.start_time  # timestamped by the response pad thread
                             response_time = time_of_response - time_second
                             correct = response in self.response_keys[event["second"]]
                             self.raise_and_lower_trigger(self.trigger_mapping["response"])
@@ -447,5 +451,11 @@ if __name__ in "__main__":
 
     experiment.run()
 
+    # keep the simulated trigger sequence next to the behavioural log for comparison
+    if not USE_NIDAQ:
+        export_mock_triggers(outpath.with_name(outpath.stem + "_mock-triggers.csv"))
+    experiment.display.export_onsets(outpath.with_name(outpath.stem + "_display-onsets.csv"), start_time=experiment.start_time)
+
     # Close NI-DAQ tasks at the end of the experiment
+    experiment.listener.close()
     close_tasks()
\ No newline at end of file
@@ -13,7 +13,7 @@ from utils.params import (
 )
 from utils.quest_controller import QuestController
 
-from BreathingCerebellOPM import MiddleIndexTactileDiscriminationTask, create_trigger_mapping
+from BreathingCerebellOPM import MiddleIndexTactileDiscriminationTask, create_trigger_mapping, practice_quest_state_path, OUTPUT_PATH
 
 key_color_mapping = {
     "1": "blue",
@@ -111,13 +111,16 @@ def update_intensity(experiment):
 if __name__ == "__main__":
     # --- Collect participant info ---
     print("This is for running the practice rounds of the BREATHING experiment.\n")
+    participant_id = input("Enter participant ID: ").strip()
+    quest_state = practice_quest_state_path(participant_id)
     start_intensities = get_start_intensities()
 
     for finger, connector in connectors.items():
         connector.set_pulse_duration(STIM_DURATION)
         connector.change_intensity(start_intensities["salient"])
 
-    quest_controller = QuestController(start_val=start_intensities["weak"], max_weak=start_intensities["salient"] - 0.3, target=0.75)
+    # saved after every trial, so the main experiment can start from the practice estimate
+    quest_controller = QuestController(start_val=start_intensities["weak"], max_weak=start_intensities["salient"] - 0.3, target=0.75, checkpoint_path=quest_state)
 
     experiment = MiddleIndexTactileDiscriminationTask(
         salient_intensity=start_intensities["salient"],
@@ -157,6 +160,10 @@ if __name__ == "__main__":
 
     # print information about the final salient and weak intensities for the experimenter to note down
     print("\nPractice rounds complete.")
-    print(f"Salient intensity: {experiment.salient_intensity}\n\n")
+    print(f"Salient intensity: {experiment.salient_intensity}")
+    quest_controller.flush_checkpoint()
+    # practice runs without a logfile, so the display onsets (including the green response cue) go to their own file
+    experiment.display.export_onsets(OUTPUT_PATH / f"sub-{participant_id}_task-breathing-practice_display-onsets.csv", start_time=experiment.start_time)
+    print(f"QUEST state saved to {quest_state}\n\n")
 
   
@@ -17,4 +17,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("Stopped.")
     finally:
-        listener.stop_listener()
\ No newline at end of file
+        listener.close()
\ No newline at end of file
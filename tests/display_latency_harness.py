@@ -0,0 +1,42 @@
+"""
+Runs the offline display latency estimate (utils.display_latency) on simulated photodiode
+traces and checks it recovers the simulated latencies. No display or photodiode needed.
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.display_latency import detect_transitions, match_onsets, simulate_photodiode, summarise
+
+
+TOLERANCE_S = 0.0015  # the 1 ms sensor rise time alone delays the midrange crossing by ~0.7 ms
+
+
+def check(name, onsets, **kwargs):
+    times, values, true_latencies = simulate_photodiode(onsets, seed=0, **kwargs)
+    latencies = match_onsets(onsets, detect_transitions(times, values))
+    error = np.abs(latencies - true_latencies)
+    ok = not np.isnan(latencies).any() and error.max() < TOLERANCE_S
+    summary = summarise(latencies)
+    print(f"{'OK  ' if ok else 'FAIL'} {name}: {summary['n_matched']}/{summary['n_onsets']} matched, "
+          f"mean {summary.get('mean_s', np.nan) * 1e3:.2f} ms, max error {np.nanmax(error) * 1e3:.3f} ms")
+    return ok
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(1)
+    onsets = np.cumsum(rng.uniform(1.0, 2.0, 200))  # one display change per trial
+
+    results = [
+        check("60 Hz, next refresh", onsets),
+        check("120 Hz, next refresh", onsets, refresh_hz=120),
+        check("60 Hz, two frames buffered", onsets, pipeline_frames=2),
+        check("60 Hz, noisy sensor", onsets, noise_sd=0.1),
+    ]
+
+    n_failed = results.count(False)
+    print(f"\n{len(results) - n_failed}/{len(results)} cases passed")
+    sys.exit(1 if n_failed else 0)
@@ -0,0 +1,74 @@
+"""
+Per-call cost of FixationDisplay.show_fixation, which runs right before stimuli: the retained
+items (reconfigure only what changed) against the previous immediate-mode
+drawing (delete everything, create two new lines, root.update). Also the instruction page
+turn: pre-laid-out pages against creating a new text item per page.
+
+Needs a display; the window is fullscreen for the duration of the benchmark.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.fixation_display import FixationDisplay
+
+
+def legacy_show_fixation(display, color="white"):
+    """show_fixation as it was before the retained items."""
+    display.canvas.delete("all")
+    x, y = display.center
+    size = 20
+    display.canvas.create_line(x, y-size, x, y+size, fill=color, width=3)
+    display.canvas.create_line(x-size, y, x+size, y, fill=color, width=3)
+    display.root.update()
+
+
+def legacy_show_text(display, text):
+    """show_text as it was before the retained items."""
+    display.canvas.delete("all")
+    x, y = display.center
+    display.canvas.create_text(x, y, text=text, fill="white", font=("Arial", 28))
+    display.root.update()
+
+
+def time_calls(show, colors, n=500):
+    durations = np.empty(n)
+    for i in range(n):
+        color = colors[i % len(colors)]
+        t0 = time.perf_counter()
+        show(color)
+        durations[i] = time.perf_counter() - t0
+    return durations * 1e6
+
+
+if __name__ == "__main__":
+    cases = {
+        "same colour": ["white"],
+        "alternating colour": ["white", "green"],
+    }
+    for case, colors in cases.items():
+        print(case)
+        for name in ("immediate", "retained"):
+            # fresh window each time, the immediate-mode drawing deletes the retained items
+            display = FixationDisplay(screen_index=0)
+            show = display.show_fixation if name == "retained" else (lambda color: legacy_show_fixation(display, color))
+            durations = time_calls(show, colors)
+            display.close()
+            print(f"  {name:9s}: median {np.median(durations):7.1f} us | p99 {np.percentile(durations, 99):7.1f} us | max {durations.max():7.1f} us")
+
+    pages = [f"Instruction page {i + 1}\n\nPress the blue button for the index finger\nand the yellow button for the middle finger." for i in range(8)]
+    print("instruction page turn")
+    for name in ("immediate", "prepared"):
+        display = FixationDisplay(screen_index=0)
+        if name == "prepared":
+            display.prepare_pages(pages)
+            show = display.show_page
+        else:
+            show = lambda page: legacy_show_text(display, page)
+        durations = time_calls(show, pages, n=200)
+        display.close()
+        print(f"  {name:9s}: median {np.median(durations):7.1f} us | p99 {np.percentile(durations, 99):7.1f} us | max {durations.max():7.1f} us")
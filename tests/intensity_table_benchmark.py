@@ -0,0 +1,100 @@
+"""
+Microbenchmark of BaseSGCConnector.change_intensity: the precompiled transition table
+against the previous path (float-keyed dict lookup, np.arange stepping stones and
+UTF-8 encoding of every command).
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.SGC_connector import BaseSGCConnector, split_commands
+
+
+class LegacyPathConnector(BaseSGCConnector):
+    """Connector reproducing the change_intensity/send_command path before the transition table."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    def send_command(self, command: str):
+        self.written.append(bytes(command, "utf-8"))
+
+    def change_intensity(self, target_intensity: float):
+        target_intensity = round(target_intensity, 1)
+
+        if self.current_intensity == target_intensity:
+            return
+
+        elif self.current_intensity > target_intensity:
+            self.send_command(self.command_lookup[target_intensity])
+        else:
+            if target_intensity - self.current_intensity > 1:
+                start = np.ceil(self.current_intensity)
+                end = np.floor(target_intensity) + 1
+                stepping_stones = np.arange(start, end, 1.0)
+                for stone in stepping_stones:
+                    self.send_command(self.command_lookup[stone])
+            self.send_command(self.command_lookup[target_intensity])
+
+        self.current_intensity = target_intensity
+
+
+class TablePathConnector(BaseSGCConnector):
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    def send_command(self, command: str):
+        self.written.append(bytes(command, "utf-8"))
+
+    def send_bytes(self, data: bytes):
+        self.written.append(data)
+
+
+def time_transitions(connector, pairs, n_repeats):
+    timings = np.empty(len(pairs) * n_repeats)
+    i = 0
+    for _ in range(n_repeats):
+        for start, target in pairs:
+            connector.current_intensity = start
+            t0 = time.perf_counter()
+            connector.change_intensity(target)
+            timings[i] = time.perf_counter() - t0
+            i += 1
+        connector.written.clear()
+    return timings
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(1)
+    intensities = np.arange(1.0, 10.1, 0.1).round(1).tolist()
+    pairs = [tuple(float(i) for i in rng.choice(intensities, 2)) for _ in range(2000)]
+    pairs += [(1.0, 10.0)] * 200  # worst case from start_intensity=1 to a salient intensity
+
+    t0 = time.perf_counter()
+    table_connector = TablePathConnector()
+    print(f"Table construction: {(time.perf_counter() - t0) * 1000:.1f} ms (once per connector)\n")
+    legacy_connector = LegacyPathConnector()
+
+    # sanity check that both paths end on the same final command for every pair
+    mismatches = 0
+    for start, target in pairs:
+        for connector in (legacy_connector, table_connector):
+            connector.current_intensity = start
+            connector.written.clear()
+            connector.change_intensity(target)
+        legacy = split_commands(b"".join(legacy_connector.written))
+        table = split_commands(b"".join(table_connector.written))
+        if legacy[-1:] != table[-1:] or legacy_connector.current_intensity != table_connector.current_intensity:
+            mismatches += 1
+    print(f"Final command mismatches: {mismatches} of {len(pairs)}\n")
+
+    for name, connector in [("legacy", legacy_connector), ("table", table_connector)]:
+        timings = time_transitions(connector, pairs, n_repeats=20) * 1e6
+        print(f"{name:>7}: mean {timings.mean():6.2f} us | median {np.median(timings):6.2f} us | "
+              f"p99 {np.percentile(timings, 99):6.2f} us | max {timings.max():7.2f} us")
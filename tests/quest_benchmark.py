@@ -0,0 +1,72 @@
+"""
+Per-trial QUEST cost (add_response + next_intensity, and reset) for the native engine and
+psychopy's QuestHandler, in microseconds, and for the native engine with both outcomes
+precomputed by speculate() before the response, plus the cost of saving and loading a native
+QUEST snapshot. The psychopy engine is skipped if psychopy is not installed.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.quest_controller import QuestController
+
+
+def time_trials(engine, n=1000, seed=0, speculate=False):
+    rng = np.random.default_rng(seed)
+    quest = QuestController(start_val=2.0, max_weak=5.0, target=0.75, engine=engine)
+    updates = np.empty(n)
+    for i in range(n):
+        intensity = quest.current_intensity
+        correct = int(rng.random() < 0.75)
+        if speculate:
+            quest.speculate(intensity)  # while the target is playing, off the timed path
+        t0 = time.perf_counter()
+        quest.add_response(correct, intensity=intensity)
+        quest.next_intensity()
+        updates[i] = time.perf_counter() - t0
+
+    resets = np.empty(50)
+    for i in range(len(resets)):
+        t0 = time.perf_counter()
+        quest.reset()
+        resets[i] = time.perf_counter() - t0
+    return updates * 1e6, resets * 1e6
+
+
+def time_snapshots(n=500, n_trials=300, seed=0):
+    rng = np.random.default_rng(seed)
+    quest = QuestController(start_val=2.0, max_weak=5.0, target=0.75)
+    for _ in range(n_trials):
+        quest.add_response(int(rng.random() < 0.75), intensity=quest.next_intensity())
+
+    path = Path(tempfile.mkdtemp()) / "quest-state.bin"
+    saves, loads = np.empty(n), np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        quest.save(path)
+        t1 = time.perf_counter()
+        QuestController.load(path)
+        saves[i], loads[i] = t1 - t0, time.perf_counter() - t1
+    return len(quest.snapshot()), saves * 1e6, loads * 1e6
+
+
+if __name__ == "__main__":
+    for name, engine, speculate in (("native", "native", False), ("native, speculated", "native", True), ("psychopy", "psychopy", False)):
+        try:
+            updates, resets = time_trials(engine, speculate=speculate)
+        except ImportError:
+            print(f"{name}: psychopy not installed, skipped")
+            continue
+        print(f"{name}")
+        print(f"  update: median {np.median(updates):7.1f} us | p99 {np.percentile(updates, 99):7.1f} us | max {updates.max():7.1f} us")
+        print(f"  reset:  median {np.median(resets):7.1f} us | p99 {np.percentile(resets, 99):7.1f} us | max {resets.max():7.1f} us")
+
+    size, saves, loads = time_snapshots()
+    print(f"snapshot ({size} bytes)")
+    print(f"  save:   median {np.median(saves):7.1f} us | p99 {np.percentile(saves, 99):7.1f} us | max {saves.max():7.1f} us")
+    print(f"  load:   median {np.median(loads):7.1f} us | p99 {np.percentile(loads, 99):7.1f} us | max {loads.max():7.1f} us")
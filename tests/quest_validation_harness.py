@@ -0,0 +1,67 @@
+"""
+Runs the native QUEST engine and psychopy's QuestHandler side by side through QuestController
+on simulated observers (including resets and max_weak updates, as in the breathing experiment)
+and checks that they recommend the same intensities and agree on the threshold estimate.
+A third, native controller precomputes both outcomes with speculate() before each response
+and must match too. Needs psychopy.
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.quest_controller import QuestController
+
+
+def simulated_observer(threshold, rng, beta=3.5, gamma=0.5, delta=0.01):
+    """Weibull observer on the same scale QUEST assumes."""
+    def respond(intensity):
+        p = delta * gamma + (1 - delta) * (1 - (1 - gamma) * np.exp(-10 ** (beta * (intensity - threshold))))
+        return int(rng.random() < p)
+    return respond
+
+
+def run_session(seed, n_trials=300, reset_every=60):
+    rng = np.random.default_rng(seed)
+    start_val, max_weak = rng.uniform(1.5, 4.0), rng.uniform(4.0, 6.0)
+    respond = simulated_observer(threshold=rng.uniform(1.2, 4.5), rng=rng)
+
+    controllers = [QuestController(start_val, max_weak, target=0.75, engine=e) for e in ("native", "psychopy", "native")]
+    speculating = controllers[2]
+    max_diff_intensity = max_diff_mean = 0.0
+
+    for trial in range(1, n_trials + 1):
+        intensities = [c.next_intensity() for c in controllers]
+        max_diff_intensity = max(max_diff_intensity, max(intensities) - min(intensities))
+
+        speculating.speculate(intensities[2])
+        correct = respond(intensities[1])
+        for c in controllers:
+            c.add_response(correct, intensity=intensities[1])
+
+        means = [c.handler.mean() for c in controllers]
+        quantiles = [c.handler.quantile() for c in controllers]
+        max_diff_mean = max(max_diff_mean, max(means) - min(means), max(quantiles) - min(quantiles))
+
+        if trial % reset_every == 0:
+            for c in controllers:
+                c.reset()
+        if trial == n_trials // 2:
+            for c in controllers:
+                c.update_max_weak(max_weak - 0.5)
+
+    return max_diff_intensity, max_diff_mean
+
+
+if __name__ == "__main__":
+    n_failed = 0
+    for seed in range(10):
+        diff_intensity, diff_mean = run_session(seed)
+        ok = diff_intensity == 0 and diff_mean < 1e-9
+        n_failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} seed {seed}: max intensity difference {diff_intensity:.1f}, max mean/quantile difference {diff_mean:.2e}")
+
+    print(f"\n{10 - n_failed}/10 sessions matched")
+    sys.exit(1 if n_failed else 0)
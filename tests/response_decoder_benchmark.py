@@ -0,0 +1,66 @@
+"""
+Per-poll cost of the response pad decoder: the precomputed edge-table decoder in
+NIResponsePad._process_sample against the previous per-poll bit list + dict lookups.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.responses_nidaqmx import SimulatedResponsePad
+
+
+class LegacyDecoder:
+    """The decoder as it was before the edge tables (minus the event queue)."""
+
+    def __init__(self, num_lines, debounce_s=0.03):
+        self.num_lines = num_lines
+        self.debounce_s = debounce_s
+        self.mapping = {i: str(i) for i in range(num_lines)}
+        self._last_line_time = {i: 0.0 for i in range(num_lines)}
+        self._last_bits = [0] * num_lines
+        self.presses = []
+
+    def _process_sample(self, raw_val, t):
+        bits = [(raw_val >> i) & 1 for i in range(self.num_lines)]
+
+        for idx, bit in enumerate(bits):
+            if bit and self._last_bits[idx] == 0:
+                if (t - self._last_line_time[idx]) >= self.debounce_s:
+                    self.presses.append((self.mapping[idx], t))
+                    self._last_line_time[idx] = t
+
+        self._last_bits = bits
+
+
+def synthetic_stream(num_lines, n_samples, poll_interval_s=0.0005, press_every_s=0.8, seed=0):
+    """Mostly idle lines with a 100 ms press on a random line every press_every_s."""
+    rng = np.random.default_rng(seed)
+    times = np.arange(n_samples) * poll_interval_s
+    masks = np.zeros(n_samples, dtype=int)
+    for start in np.arange(0.1, times[-1], press_every_s):
+        line = rng.integers(num_lines)
+        masks[(times >= start) & (times < start + 0.1)] |= 1 << line
+    return list(zip(times.tolist(), masks.tolist()))
+
+
+def time_decoder(decoder, stream, n_repeats=5):
+    best = np.inf
+    for _ in range(n_repeats):
+        process = decoder._process_sample
+        t0 = time.perf_counter()
+        for t, mask in stream:
+            process(mask, t)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(stream)
+
+
+if __name__ == "__main__":
+    for num_lines in (2, 4, 8):
+        stream = synthetic_stream(num_lines=num_lines, n_samples=200_000)  # 100 s at 2 kHz, presses on every line
+        legacy = time_decoder(LegacyDecoder(num_lines), stream)
+        table = time_decoder(SimulatedResponsePad(num_lines=num_lines), stream)
+        print(f"{num_lines} lines: legacy {legacy * 1e9:6.0f} ns/poll | edge table {table * 1e9:6.0f} ns/poll")
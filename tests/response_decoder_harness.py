@@ -0,0 +1,62 @@
+"""
+Feeds synthetic bitmask streams through the response pad decoder and checks the decoded
+presses (line, rise time, release time) against the expected ones. No NI hardware needed.
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+from utils.responses_nidaqmx import SimulatedResponsePad
+
+
+def decode(stream, num_lines=2, debounce_ms=30):
+    """stream: list of (time in s, raw bitmask). Returns the decoded (line, rise, release) tuples."""
+    pad = SimulatedResponsePad(num_lines=num_lines, debounce_ms=debounce_ms)
+    for t, mask in stream:
+        pad._process_sample(mask, t)
+    return [(e.line, e.rise_time, e.release_time) for e in pad.drain()]
+
+
+CASES = {
+    "single press and release": (
+        [(0.0, 0b00), (0.1, 0b01), (0.2, 0b00)],
+        [(0, 0.1, 0.2)],
+    ),
+    "press still held": (
+        [(0.0, 0b00), (0.1, 0b10), (0.2, 0b10)],
+        [(1, 0.1, None)],
+    ),
+    "two lines in one poll": (
+        [(0.0, 0b00), (0.1, 0b11), (0.2, 0b01), (0.3, 0b00)],
+        [(0, 0.1, 0.3), (1, 0.1, 0.2)],
+    ),
+    "contact bounce within debounce": (
+        [(0.0, 0b00), (0.100, 0b01), (0.105, 0b00), (0.110, 0b01), (0.2, 0b00)],
+        [(0, 0.100, 0.105)],
+    ),
+    "second press after debounce": (
+        [(0.0, 0b00), (0.1, 0b01), (0.12, 0b00), (0.2, 0b01), (0.25, 0b00)],
+        [(0, 0.1, 0.12), (0, 0.2, 0.25)],
+    ),
+    "unused high lines are ignored": (
+        [(0.0, 0b1100), (0.1, 0b1101), (0.2, 0b0100)],
+        [(0, 0.1, 0.2)],
+    ),
+    "alternating lines": (
+        [(0.0, 0b00), (0.1, 0b01), (0.15, 0b10), (0.2, 0b00)],
+        [(0, 0.1, 0.15), (1, 0.15, 0.2)],
+    ),
+}
+
+
+if __name__ == "__main__":
+    n_failed = 0
+    for name, (stream, expected) in CASES.items():
+        decoded = decode(stream)
+        ok = sorted(decoded) == sorted(expected)
+        n_failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}" + ("" if ok else f": expected {expected}, got {decoded}"))
+
+    print(f"\n{len(CASES) - n_failed}/{len(CASES)} cases passed")
+    sys.exit(1 if n_failed else 0)
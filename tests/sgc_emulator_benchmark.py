@@ -0,0 +1,74 @@
+"""
+End-to-end latency and throughput of SGCConnector against the pty SGC emulator (Linux only).
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils.SGC_connector import SGCConnector, split_commands, transmission_time
+from utils.SGC_emulator import SGCEmulator
+
+
+def pulse_latency(connector, emulator, n=200):
+    """Time from calling send_pulse until the emulator has read the command off the pty."""
+    latencies = np.empty(n)
+    for i in range(n):
+        n_before = len(emulator.received)
+        t0 = time.perf_counter()
+        connector.send_pulse()
+        emulator.wait_for(n_before + 1)
+        latencies[i] = emulator.received[n_before][0] - t0
+        emulator.wait_for_line_idle()
+    return latencies
+
+
+def intensity_sweep(connector, emulator, n=50):
+    """
+    Blocking time of the calling thread for a 1 -> 10 intensity jump, and the time until the
+    emulator's modelled 38400-baud line has clocked in the last command.
+    """
+    call_times = np.empty(n)
+    delivery_times = np.empty(n)
+    for i in range(n):
+        connector.change_intensity(1.0)
+        connector.wait_until_sent()
+        emulator.wait_for(len(emulator.received))
+        emulator.wait_for_line_idle()
+        n_before = len(emulator.received)
+
+        t0 = time.perf_counter()
+        connector.change_intensity(10.0)
+        call_times[i] = time.perf_counter() - t0
+        n_commands = len(split_commands(connector.transition_table[10][100]))
+        emulator.wait_for(n_before + n_commands)
+        delivery_times[i] = emulator.received[-1][1] - t0
+    return call_times, delivery_times
+
+
+def summary(name, values):
+    values = values * 1e6
+    print(f"  {name:<28} median {np.median(values):8.1f} us | p99 {np.percentile(values, 99):8.1f} us | max {values.max():8.1f} us")
+
+
+if __name__ == "__main__":
+    for asynchronous in (False, True):
+        with SGCEmulator(simulate_line_timing=True) as emulator:
+            connector = SGCConnector(port=emulator.port, start_intensity=1, asynchronous=asynchronous)
+            connector.set_pulse_duration(100)
+
+            print(f"\nSGCConnector(asynchronous={asynchronous}) on {emulator.port}")
+            summary("send_pulse -> device", pulse_latency(connector, emulator))
+            call_times, delivery_times = intensity_sweep(connector, emulator)
+            summary("change_intensity(1->10) call", call_times)
+            summary("change_intensity -> line done", delivery_times)
+
+            connector.close()
+            emulator.wait_for(len(emulator.received))
+            print(f"  Emulator state: intensity={emulator.intensity}, pulse_duration={emulator.pulse_duration}, "
+                  f"pulses={emulator.n_pulses}, errors={len(emulator.errors)}")
+
+    print(f"\nAt 38400 baud a pulse command occupies the line for {transmission_time(9) * 1e6:.0f} us.")
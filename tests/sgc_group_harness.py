@@ -0,0 +1,117 @@
+"""
+Checks SGCConnectorGroup.fire_all failure reporting and that its pulses never overlap a write
+from an asynchronous connector's writer thread. Uses fake ports, no hardware needed.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+from utils.SGC_connector import SGCConnector, SGCFakeConnector
+from utils.SGC_group import SGCConnectorGroup
+
+
+class FailingConnector(SGCFakeConnector):
+    def write_immediately(self, data: bytes):
+        raise OSError("port unplugged")
+
+
+class HangingConnector(SGCFakeConnector):
+    def write_immediately(self, data: bytes):
+        time.sleep(0.5)
+
+
+class OverlapDetectingPort:
+    """Serial port stand-in whose writes take a while and that counts concurrent writes."""
+
+    port = "fake"
+    is_open = True
+
+    def __init__(self):
+        self._active = 0
+        self._lock = threading.Lock()
+        self.overlaps = 0
+
+    def write(self, data):
+        with self._lock:
+            self._active += 1
+            self.overlaps += self._active > 1
+        time.sleep(0.0005)
+        with self._lock:
+            self._active -= 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class FakePortConnector(SGCConnector):
+    def open_serial_port(self, port, timeout):
+        return OverlapDetectingPort()
+
+
+def fire_timeout(connectors):
+    group = SGCConnectorGroup(connectors, timeout=0.2)
+    try:
+        group.fire_all()
+    except TimeoutError as e:
+        return e
+    finally:
+        time.sleep(0.5)  # let the hanging worker finish before the next case
+    return None
+
+
+def case_port_error_is_cause():
+    error = fire_timeout({"a": FailingConnector(), "b": HangingConnector()})
+    return error is not None and isinstance(error.__cause__, OSError) and "'b'" in str(error)
+
+
+def case_timeout_without_port_error():
+    error = fire_timeout({"a": SGCFakeConnector(), "b": HangingConnector()})
+    return error is not None and error.__cause__ is None
+
+
+def case_no_overlapping_writes():
+    connectors = {name: FakePortConnector(name, asynchronous=True) for name in ("a", "b")}
+    group = SGCConnectorGroup(connectors)
+    stop = threading.Event()
+
+    def keep_writing():
+        while not stop.is_set():
+            for connector in connectors.values():
+                connector.send_bytes(b"D,100\r")
+            time.sleep(0.0002)
+
+    writer = threading.Thread(target=keep_writing)
+    writer.start()
+    for _ in range(100):
+        for connector in connectors.values():
+            connector.write_immediately(connector.PULSE_BYTES)  # as fire_all's workers do, without waiting
+    stop.set()
+    writer.join()
+    for connector in connectors.values():
+        connector.close()
+    group.close()
+    return all(connector.serialport.overlaps == 0 for connector in connectors.values())
+
+
+CASES = {
+    "timeout carries the port error as its cause": case_port_error_is_cause,
+    "timeout without a port error has no cause": case_timeout_without_port_error,
+    "pulses never overlap writer-thread writes": case_no_overlapping_writes,
+}
+
+
+if __name__ == "__main__":
+    n_failed = 0
+    for name, case in CASES.items():
+        ok = case()
+        n_failed += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+
+    print(f"\n{len(CASES) - n_failed}/{len(CASES)} cases passed")
+    sys.exit(1 if n_failed else 0)
@@ -0,0 +1,60 @@
+"""
+Per-trigger driver call latency and OPM/SQUID inter-port skew, comparing one DAQmx task
+per port with a single task spanning both ports (utils.triggers_nidaqmx.SINGLE_TASK).
+
+In two-task mode the skew is the time between the OPM and the SQUID write returning. In
+single-task mode both ports are updated by one driver call, so there is no software skew
+left to measure; check the remaining hardware skew on a scope if needed.
+"""
+
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parents[1]))
+
+import numpy as np
+
+from utils import triggers_nidaqmx as triggers
+
+
+def benchmark(single_task, n=500, code=1):
+    triggers.close_tasks()
+    triggers.SINGLE_TASK = single_task
+    triggers._init_task()
+
+    latencies = np.empty(n)
+    skews = np.full(n, np.nan)
+
+    for i in range(n):
+        t0 = time.perf_counter()
+        if triggers.USE_NIDAQ and not single_task:
+            triggers._trigger_task_OPM.write(code, auto_start=True)
+            t_opm = time.perf_counter()
+            triggers._trigger_task_SQUID.write(code, auto_start=True)
+            t_squid = time.perf_counter()
+            skews[i] = t_squid - t_opm
+        else:
+            triggers._write(code)  # one call for both ports (or the mock): no skew to measure
+        latencies[i] = time.perf_counter() - t0
+        triggers._write(0)
+
+    return latencies, skews
+
+
+if __name__ == "__main__":
+    if not triggers.USE_NIDAQ:
+        print("NI-DAQ not available, timing the mock backend.\n")
+
+    for single_task in (False, True):
+        latencies, skews = benchmark(single_task)
+        latencies *= 1e6
+        skews *= 1e6
+        print(f"SINGLE_TASK={single_task}")
+        print(f"  raise call latency: median {np.median(latencies):7.1f} us | p99 {np.percentile(latencies, 99):7.1f} us | max {latencies.max():7.1f} us")
+        if np.isnan(skews).all():
+            reason = "single write" if single_task else "mock backend"
+            print(f"  OPM -> SQUID skew:  not measured ({reason})\n")
+        else:
+            print(f"  OPM -> SQUID skew:  median {np.median(skews):7.1f} us | p99 {np.percentile(skews, 99):7.1f} us | max {skews.max():7.1f} us\n")
+
+    triggers.close_tasks()
@@ -2,15 +2,39 @@ import serial
 from abc import ABC, abstractmethod
 from pathlib import Path
 import csv
-import numpy as np
-from typing import Union
-    
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Union
+
+_STOP_WRITER = object()  # sentinel that shuts down the background writer thread
+
+BAUDRATE = 38400
+BITS_PER_BYTE = 10  # 8N1: start bit + 8 data bits + stop bit
+
+
+def transmission_time(n_bytes: int, baudrate: int = BAUDRATE) -> float:
+    """Time in seconds it takes to clock n_bytes onto the serial line."""
+    return n_bytes * BITS_PER_BYTE / baudrate
+
+
+def split_commands(data: bytes) -> List[str]:
+    """Split a byte sequence of concatenated SGC commands (each terminated by '#')."""
+    return [command + "#" for command in data.decode("utf-8").split("#") if command]
+
+
 class BaseSGCConnector(ABC):
     def __init__(self, intensity_codes_path: Union[Path, None] = None, start_intensity=1):
         self.command_lookup = self.prep_intensity_codes_lookup(intensity_codes_path)
         self.current_intensity = start_intensity
         self.PULSE_COMMAND = "?*A,S$C0#"
         self.WAKEUP_COMMAND = "?*W$57#"
+        self.PULSE_BYTES = self.PULSE_COMMAND.encode("utf-8")
+
+        # byte-level tables built once so an intensity change is a single lookup + write
+        self.intensity_bytes = self.prep_intensity_bytes_table(self.command_lookup)
+        self.transition_table = self.prep_transition_table(self.intensity_bytes)
 
     def prep_intensity_codes_lookup(self, path=None):
         if path is None:
@@ -23,29 +47,96 @@ class BaseSGCConnector(ABC):
                 lookup[float(row[1])] = row[0]
         return lookup
 
+    @staticmethod
+    def intensity_to_index(intensity: float) -> int:
+        """Intensities are in steps of 0.1, so intensity*10 is used as table index."""
+        return int(round(intensity * 10))
+
+    def prep_intensity_bytes_table(self, command_lookup: dict) -> List[Optional[bytes]]:
+        """
+        List indexed by intensity*10 holding the pre-encoded command for that intensity
+        (None for intensities without a code).
+        """
+        max_idx = max(self.intensity_to_index(intensity) for intensity in command_lookup)
+        table: List[Optional[bytes]] = [None] * (max_idx + 1)
+        for intensity, command in command_lookup.items():
+            table[self.intensity_to_index(intensity)] = command.encode("utf-8")
+        return table
+
+    def prep_transition_table(self, intensity_bytes: List[Optional[bytes]]) -> List[List[Optional[bytes]]]:
+        """
+        Precompute the complete byte sequence for every (from, to) intensity pair.
+
+        Going down is a single command. Going up by more than 1.0 first passes through
+        every whole intensity on the way (stepping stones), then sets the target.
+        table[from_idx][to_idx] is an empty bytes object if from == to, and None if
+        either intensity has no code.
+        """
+        n = len(intensity_bytes)
+        table: List[List[Optional[bytes]]] = [[None] * n for _ in range(n)]
+
+        for from_idx in range(n):
+            for to_idx in range(n):
+                target = intensity_bytes[to_idx]
+                if target is None:
+                    continue
+
+                if from_idx == to_idx:
+                    table[from_idx][to_idx] = b""
+                elif from_idx > to_idx or to_idx - from_idx <= 10:
+                    table[from_idx][to_idx] = target
+                else:
+                    # whole intensities from ceil(from) up to and including floor(to)
+                    first_stone = -(-from_idx // 10) * 10
+                    stones = [intensity_bytes[idx] for idx in range(first_stone, to_idx + 1, 10)]
+                    if any(stone is None for stone in stones):
+                        continue
+                    table[from_idx][to_idx] = b"".join(stones) + target
+
+        return table
+
     @abstractmethod
     def send_command(self, command: str):
         pass
 
+    def send_bytes(self, data: bytes):
+        """
+        Send one or more already encoded commands. Subclasses talking to a real
+        device should override this to skip the str round trip.
+        """
+        for command in split_commands(data):
+            self.send_command(command)
+
+    def write_immediately(self, data: bytes):
+        """Send bytes on the calling thread, bypassing any queue (used for simultaneous pulses)."""
+        self.send_bytes(data)
+
+    def wait_until_sent(self):
+        """Block until every queued command has been written."""
+        pass
+
     def send_pulse(self):
-        self.send_command(self.PULSE_COMMAND)
+        self.send_bytes(self.PULSE_BYTES)
+
+    def transition_bytes(self, target_intensity: float) -> bytes:
+        """Complete byte sequence that takes the device from the current to the target intensity."""
+        from_idx = self.intensity_to_index(self.current_intensity)
+        to_idx = self.intensity_to_index(target_intensity)
+
+        try:
+            data = self.transition_table[from_idx][to_idx]
+        except IndexError:
+            data = None
+        if data is None:
+            raise ValueError(f"No intensity code for transition {self.current_intensity} -> {target_intensity}")
+        return data
 
     def change_intensity(self, target_intensity: float):
         target_intensity = round(target_intensity, 1)
 
-        if self.current_intensity == target_intensity:
-            return
-
-        elif self.current_intensity > target_intensity:
-            self.send_command(self.command_lookup[target_intensity])
-        else:
-            if target_intensity - self.current_intensity > 1:
-                start = np.ceil(self.current_intensity)
-                end = np.floor(target_intensity) + 1
-                stepping_stones = np.arange(start, end, 1.0)
-                for stone in stepping_stones:
-                    self.send_command(self.command_lookup[stone])
-            self.send_command(self.command_lookup[target_intensity])
+        data = self.transition_bytes(target_intensity)
+        if data:
+            self.send_bytes(data)
 
         self.current_intensity = target_intensity
 
@@ -69,18 +160,122 @@ class BaseSGCConnector(ABC):
 
 
 class SGCConnector(BaseSGCConnector):
-    def __init__(self, port, intensity_codes_path: Union[Path, None] = None, start_intensity=1, timeout=1):
+    def __init__(self, port, intensity_codes_path: Union[Path, None] = None, start_intensity=1, timeout=1, asynchronous: bool = False, queue_size: int = 64):
+        """
+        asynchronous : bool
+            If True, all writes are handed to a background writer thread through a bounded
+            queue so the calling thread never blocks on the serial port. Adjacent non-pulse
+            commands are coalesced into one write, and send_pulse returns a Future that
+            resolves to the perf_counter time the pulse bytes left the output buffer.
+        """
         super().__init__(intensity_codes_path, start_intensity)
         self.serialport = self.open_serial_port(port, timeout)
+        # the writer thread and SGCConnectorGroup workers (write_immediately) share the port
+        self._write_lock = threading.Lock()
+
+        self._write_queue: Optional[queue.Queue] = None
+        self._writer_thread: Optional[threading.Thread] = None
+        if asynchronous:
+            self._write_queue = queue.Queue(maxsize=queue_size)
+            self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._writer_thread.start()
+
+    @property
+    def asynchronous(self) -> bool:
+        return self._write_queue is not None
 
     def open_serial_port(self, port, timeout):
-        return serial.Serial(port=port, baudrate=38400, timeout=timeout)
+        return serial.Serial(port=port, baudrate=BAUDRATE, timeout=timeout)
 
     def send_command(self, command: str):
-        self.serialport.write(bytes(command, "utf-8"))
+        self.send_bytes(bytes(command, "utf-8"))
+
+    def send_bytes(self, data: bytes):
+        if self._write_queue is None:
+            with self._write_lock:
+                self.serialport.write(data)
+        else:
+            self._write_queue.put((data, None))
+
+    def write_immediately(self, data: bytes):
+        with self._write_lock:
+            self.serialport.write(data)
+            self.serialport.flush()
+
+    def send_pulse(self) -> Optional[Future]:
+        if self._write_queue is None:
+            with self._write_lock:
+                self.serialport.write(self.PULSE_BYTES)
+            return None
+
+        future: Future = Future()
+        self._write_queue.put((self.PULSE_BYTES, future))
+        return future
+
+    def _writer_loop(self):
+        pending = None
+
+        while True:
+            item = pending if pending is not None else self._write_queue.get()
+            pending = None
+            if item is _STOP_WRITER:
+                self._write_queue.task_done()
+                break
+
+            data, future = item
+            n_items = 1
+
+            # coalesce adjacent non-pulse commands into one write; pulses are always
+            # written on their own so their timestamp is exact
+            if future is None:
+                chunks = [data]
+                while True:
+                    try:
+                        next_item = self._write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if next_item is _STOP_WRITER or next_item[1] is not None:
+                        pending = next_item
+                        break
+                    chunks.append(next_item[0])
+                    n_items += 1
+                data = b"".join(chunks)
+
+            try:
+                with self._write_lock:
+                    self.serialport.write(data)
+                    self.serialport.flush()  # wait until the bytes have left the output buffer
+                    sent_time = time.perf_counter()
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+                else:
+                    print(f"[SGC] Write failed on {self.serialport.port}: {e}")
+            else:
+                if future is not None:
+                    future.set_result(sent_time)
+
+            for _ in range(n_items):
+                self._write_queue.task_done()
+
+    def wait_until_sent(self):
+        if self._write_queue is not None:
+            self._write_queue.join()
+
+    def close(self):
+        if getattr(self, "_writer_thread", None) is not None:
+            self._write_queue.put(_STOP_WRITER)
+            self._writer_thread.join()
+            self._writer_thread = None
+            self._write_queue = None
+
+        if self.serialport and self.serialport.is_open:
+            self.serialport.close()
 
     def __del__(self):
-        if hasattr(self, "serialport") and self.serialport and self.serialport.is_open:
+        # never joins: a running writer thread holds a reference to self, so this only runs
+        # once there is no writer left and the port can simply be closed
+        if getattr(self, "serialport", None) is not None and self.serialport.is_open:
             self.serialport.close()
 
 
@@ -0,0 +1,173 @@
+"""
+Emulator of an SGC stimulator on a Linux pseudo-terminal.
+
+The emulator opens a pty pair and serves the slave end as a serial port, so the real
+SGCConnector (pyserial, OS buffering and all) can be pointed at `emulator.port` and
+benchmarked end-to-end without the stimulators connected.
+"""
+
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from typing import List, Optional, Tuple
+
+from .SGC_connector import BAUDRATE, transmission_time
+
+
+def command_checksum(body: str) -> str:
+    """Checksum used by the SGC protocol: sum of the characters between '?'/'?*' and '$', mod 256."""
+    return f"{sum(body.encode('utf-8')) % 256:02X}"
+
+
+class SGCEmulator:
+    """
+    Parses the SGC command protocol received on a pty and keeps track of the device state.
+
+    Supported commands
+    ------------------
+    ?*A,S$C0#      deliver a pulse
+    ?I,<n>$<cs>#   set intensity to n/10 mA
+    ?L,<n>$<cs>#   set pulse duration (n*10 us)
+    ?D,<0|1>$<cs># trigger delay of 0 or 50 ms
+    ?*W$57#        wake up
+
+    Every received command is stored in self.received as (arrival_time, line_time, command),
+    where arrival_time is the perf_counter time it was read from the pty and line_time is
+    when the last byte would have been clocked in at `baudrate` if simulate_line_timing is
+    True (equal to arrival_time otherwise).
+    """
+
+    def __init__(self, simulate_line_timing: bool = False, baudrate: int = BAUDRATE, verbose: bool = False):
+        self.simulate_line_timing = simulate_line_timing
+        self.baudrate = baudrate
+        self.verbose = verbose
+
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._master_fd)
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+
+        # device state
+        self.intensity: Optional[float] = None
+        self.pulse_duration: Optional[int] = None
+        self.trigger_delay: Optional[int] = None
+        self.awake = False
+        self.n_pulses = 0
+        self.pulse_intensities: List[Optional[float]] = []
+
+        self.received: List[Tuple[float, float, str]] = []
+        self.errors: List[str] = []
+
+        self._buffer = ""
+        self._line_free_at = 0.0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------------------------------------------------
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=0.5)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self._master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------
+    def _read_loop(self):
+        while self._running:
+            ready, _, _ = select.select([self._master_fd], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self._master_fd, 4096)
+            except OSError:
+                break
+            t = time.perf_counter()
+            self._feed(chunk.decode("utf-8", errors="replace"), t)
+
+    def _feed(self, text: str, arrival_time: float):
+        self._buffer += text
+
+        while "#" in self._buffer:
+            command, self._buffer = self._buffer.split("#", 1)
+            command += "#"
+
+            line_time = arrival_time
+            if self.simulate_line_timing:
+                # the line is busy until the previous command has been clocked in
+                start = max(arrival_time, self._line_free_at)
+                line_time = start + transmission_time(len(command), self.baudrate)
+                self._line_free_at = line_time
+
+            self.received.append((arrival_time, line_time, command))
+            self.handle_command(command)
+
+    # ---------------------------------------------------------
+    def handle_command(self, command: str):
+        if self.verbose:
+            print(f"[EMULATOR] {command}")
+
+        if not command.startswith("?") or "$" not in command:
+            self.errors.append(f"Malformed command: {command}")
+            return
+
+        body, checksum = command[1:-1].split("$", 1)
+        body = body.lstrip("*")
+
+        if checksum != command_checksum(body):
+            self.errors.append(f"Bad checksum in {command} (expected {command_checksum(body)})")
+            return
+
+        name, _, value = body.partition(",")
+
+        if name == "A":
+            self.n_pulses += 1
+            self.pulse_intensities.append(self.intensity)
+        elif name == "I":
+            self.intensity = int(value) / 10
+        elif name == "L":
+            self.pulse_duration = int(value) * 10
+        elif name == "D":
+            self.trigger_delay = 50 if value == "1" else 0
+        elif name == "W":
+            self.awake = True
+        else:
+            self.errors.append(f"Unknown command: {command}")
+
+    def wait_for_line_idle(self):
+        """Sleep until the modelled serial line has clocked in everything received so far."""
+        remaining = self._line_free_at - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def wait_for(self, n_commands: int, timeout: float = 1.0) -> bool:
+        """Wait until at least n_commands have been received in total."""
+        deadline = time.perf_counter() + timeout
+        while len(self.received) < n_commands:
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.0001)
+        return True
@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .SGC_connector import BaseSGCConnector
+
+
+class SGCConnectorGroup:
+    """
+    Fires pulses on several SGC connectors at (nearly) the same time.
+
+    Every connector gets its own persistent worker thread. On fire_all the pulse bytes are
+    staged for each selected worker, the workers meet at a barrier and then write to their
+    ports in parallel, so the second finger is not delayed by the first write. The measured
+    inter-device skew of each event is returned and kept in self.skews.
+    """
+
+    def __init__(self, connectors: Dict[str, BaseSGCConnector], timeout: float = 1.0, warn_skew_s: float = 0.001):
+        self.connectors = connectors
+        self.timeout = timeout
+        self.warn_skew_s = warn_skew_s
+        self.skews: List[float] = []
+
+        self._queues: Dict[str, queue.Queue] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        for name in connectors:
+            self._queues[name] = queue.Queue()
+            self._threads[name] = threading.Thread(target=self._worker_loop, args=(name,), daemon=True)
+            self._threads[name].start()
+
+    def _worker_loop(self, name):
+        connector = self.connectors[name]
+        work = self._queues[name]
+
+        while True:
+            job = work.get()
+            if job is None:
+                break
+            data, start, done, results = job
+
+            try:
+                start.wait(timeout=self.timeout)
+                t_release = time.perf_counter()
+                connector.write_immediately(data)
+                t_sent = time.perf_counter()
+                results[name] = (t_release, t_sent)
+            except Exception as e:
+                results[name] = e
+            finally:
+                try:
+                    done.wait(timeout=self.timeout)
+                except threading.BrokenBarrierError:
+                    pass
+
+    def fire_all(self, names: Optional[Iterable[str]] = None) -> dict:
+        """
+        Send a pulse to all named connectors (all connectors if None) simultaneously.
+
+        Returns
+        -------
+        dict
+            "sent": perf_counter time each connector's pulse left its output buffer,
+            "release": time each worker passed the start barrier,
+            "skew": max - min of the sent times in seconds.
+        """
+        names = list(self.connectors) if names is None else list(names)
+
+        if len(names) == 1:
+            connector = self.connectors[names[0]]
+            connector.wait_until_sent()
+            t_release = time.perf_counter()
+            connector.write_immediately(connector.PULSE_BYTES)
+            t_sent = time.perf_counter()
+            return {"sent": {names[0]: t_sent}, "release": {names[0]: t_release}, "skew": 0.0}
+
+        # anything still queued on an asynchronous connector has to go out before the pulse
+        for name in names:
+            self.connectors[name].wait_until_sent()
+
+        start = threading.Barrier(len(names))
+        done = threading.Barrier(len(names) + 1)
+        results: dict = {}
+
+        for name in names:
+            self._queues[name].put((self.connectors[name].PULSE_BYTES, start, done, results))
+
+        try:
+            done.wait(timeout=self.timeout)
+        except threading.BrokenBarrierError:
+            error = self._fire_timeout(names, results)
+            raise error from error.__cause__
+
+        for name in names:
+            if isinstance(results.get(name), Exception):
+                raise results[name]
+            if name not in results:
+                raise TimeoutError(f"Pulse on '{name}' did not complete within {self.timeout} s")
+
+        sent = {name: results[name][1] for name in names}
+        skew = max(sent.values()) - min(sent.values())
+        self.skews.append(skew)
+
+        if skew > self.warn_skew_s:
+            print(f"[SGC] Inter-device skew of {skew * 1000:.3f} ms for {names}")
+
+        return {"sent": sent, "release": {name: results[name][0] for name in names}, "skew": skew}
+
+    def _fire_timeout(self, names, results) -> TimeoutError:
+        """TimeoutError naming the connectors that did not finish, chained to the first port error."""
+        stuck = [name for name in names if name not in results]
+        errors = {
+            name: results[name] for name in names
+            if isinstance(results.get(name), Exception) and not isinstance(results[name], threading.BrokenBarrierError)
+        }
+        message = f"Pulse did not complete within {self.timeout} s"
+        if stuck:
+            message += f"; no result from {stuck}"
+        if errors:
+            message += "; " + ", ".join(f"'{name}' failed: {e!r}" for name, e in errors.items())
+        error = TimeoutError(message)
+        error.__cause__ = next(iter(errors.values()), None)
+        return error
+
+    def close(self):
+        for name, thread in self._threads.items():
+            self._queues[name].put(None)
+            thread.join(timeout=self.timeout)
+        self._threads = {}
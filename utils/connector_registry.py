@@ -0,0 +1,164 @@
+"""
+Lazy, config-driven registry of SGC connectors.
+
+Nothing is opened at import time: the connectors are constructed the first time the
+registry is accessed (e.g. connectors["index"] or connectors.items()), with the setup of
+all configured ports running in parallel.
+
+Configuration is taken (in increasing priority) from the defaults passed by utils.params,
+a JSON file given by the CEREBELLOPM_SGC_CONFIG environment variable, and the
+CEREBELLOPM_SGC_BACKEND environment variable. Example config file:
+
+    {
+        "backend": "real",
+        "asynchronous": false,
+        "ports": {"middle": "COM4", "index": "COM5"}
+    }
+
+Backends
+--------
+real      SGCConnector on the configured serial ports
+fake      SGCFakeConnector, no hardware needed
+emulator  SGCConnector talking to an SGCEmulator on a pseudo-terminal (Linux/macOS)
+daemon    SGCDaemonClient forwarding to a running utils.stimulator_daemon
+"""
+
+import json
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .SGC_connector import BaseSGCConnector, SGCConnector, SGCFakeConnector
+
+BACKENDS = ("real", "fake", "emulator", "daemon")
+CONFIG_ENV = "CEREBELLOPM_SGC_CONFIG"
+BACKEND_ENV = "CEREBELLOPM_SGC_BACKEND"
+
+
+def load_config(defaults: dict) -> dict:
+    config = dict(defaults)
+
+    config_path = os.environ.get(CONFIG_ENV)
+    if config_path:
+        with open(config_path, mode="r") as file:
+            config.update(json.load(file))
+
+    backend = os.environ.get(BACKEND_ENV)
+    if backend:
+        config["backend"] = backend
+
+    if config.get("backend") not in BACKENDS:
+        raise ValueError(f"Unknown SGC backend '{config.get('backend')}'. Choose one of {BACKENDS}")
+
+    return config
+
+
+class ConnectorRegistry(Mapping):
+    """
+    Read-only mapping from finger name to connector that constructs the connectors on first use.
+    """
+
+    def __init__(
+            self,
+            ports: Dict[str, str],
+            backend: str = "real",
+            intensity_codes_path: Union[Path, None] = None,
+            start_intensity=1,
+            asynchronous: bool = False,
+        ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown SGC backend '{backend}'. Choose one of {BACKENDS}")
+
+        self.ports = dict(ports)
+        self.backend = backend
+        self.intensity_codes_path = intensity_codes_path
+        self.start_intensity = start_intensity
+        self.asynchronous = asynchronous
+
+        self.emulators: dict = {}
+        self._connectors: Optional[Dict[str, BaseSGCConnector]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, defaults: dict) -> "ConnectorRegistry":
+        config = load_config(defaults)
+        return cls(
+            ports=config["ports"],
+            backend=config["backend"],
+            intensity_codes_path=config.get("intensity_codes_path"),
+            start_intensity=config.get("start_intensity", 1),
+            asynchronous=config.get("asynchronous", False),
+        )
+
+    # ---------------------------------------------------------
+    def _make_connector(self, name: str) -> BaseSGCConnector:
+        if self.backend == "fake":
+            return SGCFakeConnector(intensity_codes_path=self.intensity_codes_path, start_intensity=self.start_intensity)
+
+        if self.backend == "daemon":
+            from .stimulator_daemon import SGCDaemonClient
+
+            return SGCDaemonClient(name, intensity_codes_path=self.intensity_codes_path)
+
+        port = self.ports[name]
+        if self.backend == "emulator":
+            from .SGC_emulator import SGCEmulator
+
+            emulator = SGCEmulator(simulate_line_timing=True).start()
+            self.emulators[name] = emulator
+            port = emulator.port
+
+        return SGCConnector(
+            port=port,
+            intensity_codes_path=self.intensity_codes_path,
+            start_intensity=self.start_intensity,
+            asynchronous=self.asynchronous,
+        )
+
+    def load(self) -> Dict[str, BaseSGCConnector]:
+        """Construct all configured connectors (in parallel) if this has not happened yet."""
+        with self._lock:
+            if self._connectors is None:
+                names = list(self.ports)
+                with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+                    futures = [pool.submit(self._make_connector, name) for name in names]
+                errors = [future.exception() for future in futures if future.exception() is not None]
+                if errors:
+                    # do not leak the ports that did open
+                    for future in futures:
+                        if future.exception() is None and hasattr(future.result(), "close"):
+                            future.result().close()
+                    for emulator in self.emulators.values():
+                        emulator.close()
+                    self.emulators = {}
+                    raise errors[0]
+                self._connectors = {name: future.result() for name, future in zip(names, futures)}
+                print(f"[SGC] {len(names)} connector(s) ready using the '{self.backend}' backend.")
+        return self._connectors
+
+    @property
+    def loaded(self) -> bool:
+        return self._connectors is not None
+
+    # ---------------------------------------------------------
+    def __getitem__(self, name: str) -> BaseSGCConnector:
+        return self.load()[name]
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.ports)
+
+    def close(self):
+        if self._connectors:
+            for connector in self._connectors.values():
+                if hasattr(connector, "close"):
+                    connector.close()
+        for emulator in self.emulators.values():
+            emulator.close()
+        self._connectors = None
+        self.emulators = {}
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+from typing import List, Tuple, Union
+
+from .display_latency import write_onsets
+
+
+DISPLAY_BACKEND_ENV = "CEREBELLOPM_DISPLAY_BACKEND"
+DEFAULT_DISPLAY_BACKEND = "tk" if sys.platform == "darwin" else "server"
+
+
+class NullDisplay:
+    """
+    Display backend that draws nothing. It keeps the same state logic and onset record as
+    FixationDisplay, so a session can be simulated headless and as fast as the clock allows.
+    Instruction pages are recorded in pages_shown instead of waiting for Enter.
+    """
+
+    def __init__(self, screen_index: int = 0, **kwargs):
+        self.screen_index = screen_index
+        self.onsets: List[Tuple[float, str]] = []
+        self.pages_shown: List[str] = []
+        self._state = None
+        print(f"[DISPLAY] Null display (screen {screen_index}), nothing is shown.")
+
+    def _change(self, state, label: str) -> float:
+        if self._state == state:
+            return self.onsets[-1][0]
+        self._state = state
+        t = time.perf_counter()
+        self.onsets.append((t, label))
+        return t
+
+    def show_fixation(self, color="white") -> float:
+        return self._change(("fixation", color), f"fixation/{color}")
+
+    def show_text(self, text) -> float:
+        return self._change(("text", text), "text")
+
+    def prepare_pages(self, pages):
+        pass
+
+    def show_page(self, page) -> float:
+        self.pages_shown.append(page)
+        self.show_text(page)
+        return time.perf_counter()
+
+    def report_page_turns(self):
+        pass
+
+    def show_instructions(self, instructions):
+        if not instructions:
+            return
+
+        self.prepare_pages(instructions)
+        for page in instructions:
+            self.show_page(page)
+        self.report_page_turns()
+
+    def export_onsets(self, path, start_time: float = 0.0):
+        write_onsets(path, self.onsets, start_time=start_time)
+
+    def close(self):
+        pass
+
+
+def _tk_display(**kwargs):
+    from .fixation_display import FixationDisplay
+    return FixationDisplay(**kwargs)
+
+
+def _server_display(**kwargs):
+    from .display_server import DisplayServer
+    return DisplayServer(**kwargs)
+
+
+# imported lazily: the Tk backends need tkinter, screeninfo and a screen
+DISPLAY_BACKENDS = {
+    "tk": _tk_display,
+    "server": _server_display,
+    "null": NullDisplay,
+}
+
+
+def make_display(backend: Union[str, None] = None, **kwargs):
+    """
+    Construct the display for the given backend: "server" (FixationDisplay on its own Tk thread),
+    "tk" (FixationDisplay on the calling thread) or "null" (headless, records onsets only).
+    Defaults to the CEREBELLOPM_DISPLAY_BACKEND environment variable, or "server" ("tk" on
+    macOS, where Tk only runs on the main thread).
+    """
+    backend = backend or os.environ.get(DISPLAY_BACKEND_ENV, DEFAULT_DISPLAY_BACKEND)
+    if backend not in DISPLAY_BACKENDS:
+        raise ValueError(f"Unknown display backend '{backend}'. Choose one of {list(DISPLAY_BACKENDS)}")
+    return DISPLAY_BACKENDS[backend](**kwargs)
@@ -0,0 +1,128 @@
+"""
+Offline estimate of visual onset latency: the delay between the software onset timestamps
+recorded by FixationDisplay (photodiode=True) and the photodiode patch actually changing on
+screen.
+
+The patch flips between black and white on every display change, so every onset should be
+followed by one photodiode transition, rising or falling. Both signals must be on the same
+clock (e.g. the photodiode channel aligned to perf_counter via the experiment/start trigger).
+
+Usage:
+    python -m utils.display_latency photodiode.csv display-onsets.csv
+where photodiode.csv has columns time,value and display-onsets.csv is written by
+write_onsets (FixationDisplay.export_onsets).
+"""
+
+import argparse
+from typing import Optional
+
+import numpy as np
+
+
+ONSET_DTYPE = np.dtype([("time", "f8"), ("state", "U32")])
+
+
+def write_onsets(path, onsets, start_time: float = 0.0):
+    """Write display onsets [(perf_counter time, state), ...] as CSV, times relative to start_time."""
+    rows = np.array([(t - start_time, state) for t, state in onsets], dtype=ONSET_DTYPE)
+    np.savetxt(path, rows, delimiter=",", fmt=["%.6f", "%s"], header="time,state", comments="")
+
+
+def detect_transitions(times: np.ndarray, values: np.ndarray, threshold: Optional[float] = None) -> np.ndarray:
+    """Times at which the photodiode signal crosses threshold, in either direction (default: midrange)."""
+    if threshold is None:
+        threshold = (np.min(values) + np.max(values)) / 2
+    above = values > threshold
+    idx = np.flatnonzero(above[1:] != above[:-1]) + 1
+    return times[idx]
+
+
+def match_onsets(onsets: np.ndarray, transitions: np.ndarray, max_latency_s: float = 0.1) -> np.ndarray:
+    """
+    Latency from each onset to the first photodiode transition at or after it. NaN if there is
+    none within max_latency_s, or if that transition already belongs to an earlier onset.
+    """
+    idx = np.searchsorted(transitions, onsets)
+    latencies = np.full(len(onsets), np.nan)
+    valid = idx < len(transitions)
+    latencies[valid] = transitions[idx[valid]] - onsets[valid]
+    latencies[latencies > max_latency_s] = np.nan
+
+    # two onsets landing on the same transition: the earlier change never reached the screen
+    duplicate = np.zeros(len(onsets), dtype=bool)
+    duplicate[:-1] = valid[:-1] & (idx[:-1] == idx[1:])
+    latencies[duplicate] = np.nan
+    return latencies
+
+
+def summarise(latencies: np.ndarray) -> dict:
+    found = latencies[~np.isnan(latencies)]
+    if len(found) == 0:
+        return {"n_onsets": len(latencies), "n_matched": 0}
+    return {
+        "n_onsets": len(latencies),
+        "n_matched": len(found),
+        "mean_s": float(found.mean()),
+        "sd_s": float(found.std()),
+        "p50_s": float(np.median(found)),
+        "p99_s": float(np.percentile(found, 99)),
+        "min_s": float(found.min()),
+        "max_s": float(found.max()),
+    }
+
+
+def simulate_photodiode(onsets: np.ndarray, refresh_hz: float = 60.0, pipeline_frames: int = 1, fs: float = 5000.0,
+                        noise_sd: float = 0.02, rise_time_s: float = 0.001, seed: Optional[int] = None):
+    """
+    Photodiode trace for a display that shows each change at the first vertical refresh at
+    least pipeline_frames after the onset: (times, values, true latencies). The refresh phase
+    is random, so the latency is spread over one frame.
+    """
+    rng = np.random.default_rng(seed)
+    frame = 1.0 / refresh_hz
+    phase = rng.uniform(0, frame)
+    onsets = np.asarray(onsets, dtype=float)
+    shown = np.ceil((onsets - phase) / frame + pipeline_frames - 1) * frame + phase
+    shown = np.maximum(shown, onsets)  # a refresh right at the onset shows it at once
+
+    times = np.arange(onsets.min() - 0.1, onsets.max() + 0.2, 1.0 / fs)
+    n_flips = np.searchsorted(shown, times, side="right")
+    level = (n_flips % 2).astype(float)
+    # first-order response of the sensor, then noise
+    alpha = 1.0 - np.exp(-1.0 / (fs * rise_time_s))
+    values = np.empty_like(level)
+    v = 0.0
+    for i, target in enumerate(level):
+        v += alpha * (target - v)
+        values[i] = v
+    values += rng.normal(0, noise_sd, len(values))
+    return times, values, shown - onsets
+
+
+def _print_summary(summary: dict):
+    print(f"[DISPLAY] {summary['n_matched']}/{summary['n_onsets']} onsets matched to a photodiode transition")
+    if summary["n_matched"]:
+        print(f"[DISPLAY] latency: mean {summary['mean_s'] * 1e3:.2f} ms | sd {summary['sd_s'] * 1e3:.2f} ms | "
+              f"p50 {summary['p50_s'] * 1e3:.2f} ms | p99 {summary['p99_s'] * 1e3:.2f} ms | "
+              f"range {summary['min_s'] * 1e3:.2f}-{summary['max_s'] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate display latency from a photodiode recording.")
+    parser.add_argument("photodiode", help="CSV with columns time,value")
+    parser.add_argument("onsets", help="display onsets CSV from FixationDisplay.export_onsets")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--max-latency", type=float, default=0.1, help="in seconds")
+    parser.add_argument("--out", default=None, help="write per-onset latencies to this CSV")
+    args = parser.parse_args()
+
+    photodiode = np.genfromtxt(args.photodiode, delimiter=",", names=True)
+    onsets = np.genfromtxt(args.onsets, delimiter=",", names=True, dtype=None, encoding=None)
+
+    transitions = detect_transitions(photodiode["time"], photodiode["value"], threshold=args.threshold)
+    latencies = match_onsets(np.atleast_1d(onsets["time"]), transitions, max_latency_s=args.max_latency)
+    _print_summary(summarise(latencies))
+
+    if args.out:
+        np.savetxt(args.out, np.column_stack([onsets["time"], latencies]), delimiter=",", fmt="%.6f",
+                   header="onset,latency", comments="")
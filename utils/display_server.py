@@ -0,0 +1,127 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .fixation_display import FixationDisplay
+
+
+class DisplayServer:
+    """
+    FixationDisplay served by its own Tk thread through a command queue.
+
+    The thread creates the window and runs the Tk main loop, so the window keeps handling
+    window-manager events during long ISIs, and every poll_interval_ms it executes the commands
+    posted by the experiment. show_fixation() and show_text() return immediately with a Future
+    that resolves to the perf_counter onset time of the frame (see FixationDisplay), so display
+    work never delays a stimulus. Keyword arguments are passed on to FixationDisplay.
+
+    Tk objects are only ever touched from the server thread. Tk outside the main thread works
+    on Windows and Linux but not on macOS, so make_display() uses plain FixationDisplay there.
+
+    Commands still queued when the window goes away (close() or Escape) fail with RuntimeError
+    instead of leaving their Future pending, and posting a command after that raises
+    RuntimeError right away, so Escape ends the experiment as it does with FixationDisplay.
+    """
+
+    def __init__(self, screen_index: int = 0, poll_interval_ms: int = 1, start_timeout_s: float = 10.0, **display_kwargs):
+        self.poll_interval_ms = poll_interval_ms
+        self.display = None
+        self.closed = False
+
+        self._commands: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()  # makes posting and shutting down atomic with respect to closed
+        self._ready = threading.Event()
+        self._error = None
+
+        self._thread = threading.Thread(target=self._serve, args=(screen_index, display_kwargs), daemon=True, name="DisplayServer")
+        self._thread.start()
+
+        if not self._ready.wait(timeout=start_timeout_s):
+            raise RuntimeError(f"Display did not open within {start_timeout_s} s")
+        if self._error is not None:
+            raise self._error
+
+    # ---------------------------------------------------------
+    def _serve(self, screen_index: int, display_kwargs: dict):
+        try:
+            self.display = FixationDisplay(screen_index=screen_index, **display_kwargs)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        self.display.root.after(self.poll_interval_ms, self._run_commands)
+        try:
+            self.display.root.mainloop()  # returns when the window is destroyed (close or Escape)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self):
+        with self._lock:
+            self.closed = True
+            while True:  # fail whatever was still waiting when the window went away
+                try:
+                    future, _, _ = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+                future.set_exception(RuntimeError("Display has been closed"))
+
+    def _run_commands(self):
+        while True:
+            try:
+                future, method, args = self._commands.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                result = getattr(self.display, method)(*args)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result(result if result is not None else time.perf_counter())
+
+            if method == "close":
+                return  # window destroyed, mainloop is exiting
+
+        self.display.root.after(self.poll_interval_ms, self._run_commands)
+
+    def _post(self, method: str, *args) -> Future:
+        future = Future()
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("Display has been closed")
+            self._commands.put((future, method, args))
+        return future
+
+    # ---------------------------------------------------------
+    def show_fixation(self, color="white") -> Future:
+        return self._post("show_fixation", color)
+
+    def show_text(self, text) -> Future:
+        return self._post("show_text", text)
+
+    def show_instructions(self, instructions):
+        if not instructions:
+            return
+
+        self._post("prepare_pages", instructions).result()
+        for page in instructions:
+            self._post("show_page", page).result()
+            input("Press any key to continue to the next page of the instructions...")
+        self._post("report_page_turns")
+
+    @property
+    def onsets(self):
+        return self.display.onsets
+
+    def export_onsets(self, path, start_time: float = 0.0):
+        self.display.export_onsets(path, start_time=start_time)
+
+    def close(self):
+        """Destroy the window and stop the server thread. Safe to call more than once."""
+        with self._lock:
+            if not self.closed:
+                self._commands.put((Future(), "close", ()))
+        self._thread.join(timeout=2.0)
@@ -1,9 +1,33 @@
+import time
 import tkinter as tk
+import tkinter.font as tkfont
+
+import numpy as np
+
 from screeninfo import get_monitors
 
+from .display_latency import write_onsets
+
 
 class FixationDisplay:
-    def __init__(self, screen_index: int = 0):
+    """
+    Fullscreen black window showing either a fixation cross or a line of text.
+
+    The cross and text items are created once and afterwards only reconfigured and shown or
+    hidden, and a call that asks for what is already on screen does nothing, so show_fixation()
+    is cheap enough to call right before a stimulus. Every distinct text (break messages,
+    instruction pages) is laid out once into its own hidden item with a cached font, so showing
+    it again, or turning an instruction page, only toggles visibility.
+
+    Every change of what is on screen is recorded in onsets as (perf_counter time after the
+    redraw, state), and show_fixation/show_text return the onset time of what is shown. With
+    photodiode=True a square patch in the bottom-left corner flips between black and white on
+    every change, for a photodiode recorded alongside the MEG (see utils.display_latency).
+    """
+
+    FIXATION_SIZE = 20
+
+    def __init__(self, screen_index: int = 0, photodiode: bool = False, photodiode_size: int = 60):
         monitors = get_monitors()
 
         if screen_index >= len(monitors):
@@ -23,32 +47,113 @@ class FixationDisplay:
         self.canvas = tk.Canvas(self.root, bg="black", highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
 
-        self.root.update()
-
         self.center = (mon.width // 2, mon.height // 2)
 
-    def show_fixation(self, color="white"):
-        self.canvas.delete("all")
+        # retained items, all hidden until shown
         x, y = self.center
-        size = 20
-        self.canvas.create_line(x, y-size, x, y+size, fill=color, width=3)
-        self.canvas.create_line(x-size, y, x+size, y, fill=color, width=3)
+        size = self.FIXATION_SIZE
+        self.fixation_items = (
+            self.canvas.create_line(x, y-size, x, y+size, fill="white", width=3, state="hidden"),
+            self.canvas.create_line(x-size, y, x+size, y, fill="white", width=3, state="hidden"),
+        )
+        self.font = tkfont.Font(root=self.root, family="Arial", size=28)
+        self._text_items = {}  # text -> its canvas item
+        self._visible_text_item = None
+        self.page_turn_latencies = []  # seconds from request to redrawn page, per instruction page
+        self._state = None  # ("fixation", color) or ("text", text) currently on screen
+        self.onsets = []  # (time, state label) for every change
+
+        self.photodiode_item = None
+        self._photodiode_on = False
+        if photodiode:
+            self.photodiode_item = self.canvas.create_rectangle(
+                0, mon.height - photodiode_size, photodiode_size, mon.height, fill="black", outline=""
+            )
+
         self.root.update()
 
-    def show_text(self, text):
-        self.canvas.delete("all")
-        x, y = self.center
-        self.canvas.create_text(x, y, text=text, fill="white", font=("Arial", 28))
+    def show_fixation(self, color="white") -> float:
+        if self._state == ("fixation", color):
+            return self.onsets[-1][0]
+
+        for item in self.fixation_items:
+            self.canvas.itemconfigure(item, fill=color, state="normal")
+        self._hide_text()
+        self._state = ("fixation", color)
+        self._flip_photodiode()
+        self.root.update()  # redraw and handle pending events (Escape), as the window is not otherwise pumped
+        return self._record_onset(f"fixation/{color}")
+
+    def show_text(self, text) -> float:
+        if self._state == ("text", text):
+            return self.onsets[-1][0]
+
+        for item in self.fixation_items:
+            self.canvas.itemconfigure(item, state="hidden")
+        self._hide_text()
+        self._visible_text_item = self._text_item(text)
+        self.canvas.itemconfigure(self._visible_text_item, state="normal")
+        self._state = ("text", text)
+        self._flip_photodiode()
         self.root.update()
+        return self._record_onset("text")
+
+    def _text_item(self, text) -> int:
+        item = self._text_items.get(text)
+        if item is None:
+            x, y = self.center
+            item = self.canvas.create_text(x, y, text=text, fill="white", font=self.font, state="hidden")
+            self._text_items[text] = item
+        return item
+
+    def _hide_text(self):
+        if self._visible_text_item is not None:
+            self.canvas.itemconfigure(self._visible_text_item, state="hidden")
+            self._visible_text_item = None
+
+    def prepare_pages(self, pages):
+        """Lay out all pages up front, so showing them later only toggles visibility."""
+        for page in pages:
+            self._text_item(page)
+
+    def show_page(self, page) -> float:
+        t0 = time.perf_counter()
+        self.show_text(page)
+        # stamped here rather than taken from show_text, which returns the earlier onset if the
+        # page was already on screen
+        t1 = time.perf_counter()
+        self.page_turn_latencies.append(t1 - t0)
+        return t1
+
+    def report_page_turns(self):
+        if self.page_turn_latencies:
+            latencies = np.array(self.page_turn_latencies) * 1e3
+            print(f"[DISPLAY] {len(latencies)} page turns: median {np.median(latencies):.2f} ms | max {latencies.max():.2f} ms")
+
+    def _flip_photodiode(self):
+        if self.photodiode_item is not None:
+            self._photodiode_on = not self._photodiode_on
+            self.canvas.itemconfigure(self.photodiode_item, fill="white" if self._photodiode_on else "black")
+
+    def _record_onset(self, label: str) -> float:
+        t = time.perf_counter()
+        self.onsets.append((t, label))
+        return t
+
+    def export_onsets(self, path, start_time: float = 0.0):
+        """Write the onsets as CSV (time relative to start_time, state)."""
+        write_onsets(path, self.onsets, start_time=start_time)
     
 
     def show_instructions(self, instructions):
         if not instructions:
             return
         
+        self.prepare_pages(instructions)
         for page in instructions:
-            self.show_text(page)
+            self.show_page(page)
             input("Press any key to continue to the next page of the instructions...")
+        self.report_page_turns()
 
     def close(self):
         self.root.destroy()
@@ -0,0 +1,122 @@
+"""
+Ahead-of-time planning of the SGC intensity changes around weak targets.
+
+Changes are issued right after the stimulus before the one that needs them, not at the
+earliest point the fingers would allow. Raises back to salient already follow the target
+itself. A weak intensity is QUEST's next intensity, and QUEST is updated by the response to
+every target, so lowering a finger right after the last stimulus it received, possibly
+several targets earlier, would set an intensity that is out of date by the time its target
+is delivered.
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .SGC_connector import BaseSGCConnector, transmission_time
+
+
+def target_finger(event_type: str) -> Union[str, None]:
+    """Finger a target event is delivered to, or None for salient events (both fingers)."""
+    if "target" in event_type:
+        return event_type.split("/")[-1]
+    return None
+
+
+class IntensityScheduler:
+    """
+    Plans the intensity changes for a list of events ahead of time and checks that each
+    change has been clocked out to the device before the pulse that needs it.
+
+    The plan holds, for every event index, the changes to issue right after that event's
+    pulse, so every change is made after the previous stimulus (see the module docstring for
+    why not earlier): salient pulses go to both fingers, and a finger is lowered to the weak
+    intensity once the stimulus before its target has been delivered. After the target it is
+    raised back to salient, unless the next stimulus on that finger is another target, which
+    only needs the new weak intensity.
+
+    Each change is given the time of the next pulse as its deadline. The time the device has
+    settled is estimated from the number of bytes in the transition and the baud rate. If a
+    change would not settle `margin_s` before its deadline, it is still sent (the stimulus
+    is never delayed), but it is logged in self.missed_deadlines and printed.
+    """
+
+    def __init__(self, connectors: Dict[str, BaseSGCConnector], margin_s: float = 0.005):
+        self.connectors = connectors
+        self.margin_s = margin_s
+        self.plan: List[List[Tuple[str, str]]] = []
+        self.missed_deadlines: List[dict] = []
+        self._line_free_at = {name: 0.0 for name in connectors}
+
+    def make_plan(self, events: List[Union[dict, str]]) -> List[List[Tuple[str, str]]]:
+        """
+        For every event index, the list of (connector name, "salient" | "weak") changes to
+        issue after that event. Breaks get no changes; the changes needed after a break are
+        issued after the last stimulus before it.
+        """
+        stim_idx = [i for i, e in enumerate(events) if e != "break"]
+        plan: List[List[Tuple[str, str]]] = [[] for _ in events]
+
+        for pos, (current, upcoming) in enumerate(zip(stim_idx, stim_idx[1:] + [None])):
+            finger = target_finger(events[current]["event"])
+            if finger is not None and not self._next_use_is_target(events, stim_idx[pos + 1:], finger):
+                plan[current].append((finger, "salient"))
+
+            if upcoming is not None:
+                next_finger = target_finger(events[upcoming]["event"])
+                if next_finger is not None:
+                    plan[current].append((next_finger, "weak"))
+
+        self.plan = plan
+        return plan
+
+    @staticmethod
+    def _next_use_is_target(events, later_idx, finger) -> bool:
+        """Whether the next stimulus delivered to finger is a target (rather than salient, or none)."""
+        for i in later_idx:
+            next_finger = target_finger(events[i]["event"])
+            if next_finger is None:
+                return False
+            if next_finger == finger:
+                return True
+        return False
+
+    def after_pulse(self, event_idx: int, deadline: Optional[float], resolve: Callable[[str], float]):
+        """
+        Issue the planned changes for event_idx.
+
+        Parameters
+        ----------
+        event_idx : int
+            Index of the event whose pulse was just delivered.
+        deadline : float or None
+            perf_counter time the next pulse is due (None if there is no time constraint).
+        resolve : callable
+            Maps "salient"/"weak" to the intensity to set. Only called for planned changes.
+        """
+        for name, kind in self.plan[event_idx]:
+            connector = self.connectors[name]
+            intensity = round(resolve(kind), 1)
+            n_bytes = len(connector.transition_bytes(intensity))
+
+            issued = time.perf_counter()
+            connector.change_intensity(intensity)
+
+            start = max(issued, self._line_free_at[name])
+            settled = start + transmission_time(n_bytes)
+            self._line_free_at[name] = settled
+
+            if deadline is not None and settled > deadline - self.margin_s:
+                missed = {
+                    "event_idx": event_idx,
+                    "connector": name,
+                    "intensity": intensity,
+                    "n_bytes": n_bytes,
+                    "settled": settled,
+                    "deadline": deadline,
+                }
+                self.missed_deadlines.append(missed)
+                if settled > deadline:
+                    timing = f"settles {(settled - deadline) * 1000:.1f} ms after the next pulse is due"
+                else:
+                    timing = f"leaves only {(deadline - settled) * 1000:.1f} ms before the next pulse"
+                print(f"[SCHEDULER] Missed deadline: intensity change on {name} to {intensity} {timing}")
@@ -1,6 +1,6 @@
 import numpy as np
 import os
-from .SGC_connector import SGCConnector, SGCFakeConnector
+from .connector_registry import ConnectorRegistry
 from pathlib import Path
 
 # Params for both experiments
@@ -24,6 +24,9 @@ ISI=0.701  # seconds
 RNG_INTERVAL=(1., 1.25)  # seconds
 N_EVENTS_PER_BLOCK=150  # number of stimulus pairs per block
 
+# SGC serial writes
+SGC_ASYNC_WRITES = False  # hand serial writes to a background writer thread per connector
+
 
 
 path = Path(__file__).parents[1] 
@@ -32,22 +35,23 @@ path = Path(__file__).parents[1]
 
 if os.name == "posix":
     # macOS
-    middle_connector_port = "/dev/tty.usbserial-A50027EN"
-    index_connector_port = "/dev/tty.usbserial-A50027ER"
-
-    connectors = {
-        "middle": SGCConnector(port=middle_connector_port, intensity_codes_path=path / "intensity_code.csv", start_intensity=1),
-        "index": SGCConnector(port=index_connector_port, intensity_codes_path=path / "intensity_code.csv", start_intensity=1),  
-        #"middle": SGCFakeConnector(intensity_codes_path=path / "intensity_code.csv", start_intensity=1),
-        #"index": SGCFakeConnector(intensity_codes_path=path / "intensity_code.csv", start_intensity=1)
-        }
+    SGC_PORTS = {
+        "middle": "/dev/tty.usbserial-A50027EN",
+        "index": "/dev/tty.usbserial-A50027ER",
+    }
 else:
     # Windows
-    index_connector_port = "COM5"
-    middle_connector_port = "COM4"
-    connectors = {
-            "middle":  SGCConnector(port=middle_connector_port, intensity_codes_path=path / "intensity_code.csv", start_intensity=1),
-            "index": SGCConnector(port=index_connector_port, intensity_codes_path=path / "intensity_code.csv", start_intensity=1)
-        }
-
-
+    SGC_PORTS = {
+        "middle": "COM4",
+        "index": "COM5",
+    }
+
+# connectors are only constructed (and ports opened) on first use
+# backend can be switched with the CEREBELLOPM_SGC_BACKEND environment variable ("real", "fake", "emulator" or "daemon")
+connectors = ConnectorRegistry.from_config({
+    "backend": "real",
+    "ports": SGC_PORTS,
+    "intensity_codes_path": path / "intensity_code.csv",
+    "start_intensity": 1,
+    "asynchronous": SGC_ASYNC_WRITES,
+})
@@ -1,16 +1,247 @@
-from psychopy.data import QuestHandler
+import atexit
+import math
+import os
+import struct
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def likelihood_table(p_threshold, beta, delta, gamma, grain=0.01, dim=500):
+    """
+    Log-likelihood of an incorrect (row 0) and correct (row 1) response as a function of the
+    distance between intensity and threshold, on psychopy's QUEST grid (2 * dim + 1 steps of
+    grain), and the quantile order that makes the quantile the most informative next intensity.
+
+    Depends only on the psychometric function, so it is computed once and shared by every
+    QuestEngine (and every reset) with the same parameters.
+    """
+    x2 = np.arange(-dim, dim + 1) * grain
+    p2 = delta * gamma + (1 - delta) * (1 - (1 - gamma) * np.exp(-10 ** (beta * x2)))
+    if p2[0] >= p_threshold or p2[-1] <= p_threshold:
+        raise RuntimeError(f"psychometric function range [{p2[0]:.2f} {p2[-1]:.2f}] omits {p_threshold:.2f} threshold")
+    index = np.nonzero(p2[1:] - p2[:-1])[0]  # strictly monotonic subset
+    x_threshold = np.interp([p_threshold], p2[index], x2[index])[0]
+    p2 = delta * gamma + (1 - delta) * (1 - (1 - gamma) * np.exp(-10 ** (beta * (x2 + x_threshold))))
+
+    # reversed, so that a trial at distance d from the grid centre is a contiguous slice
+    log_s2 = np.log(np.array(((1 - p2)[::-1], p2[::-1])))
+    log_s2.setflags(write=False)
+
+    eps = 1e-14
+    pL, pH = p2[0], p2[-1]
+    pE = pH * math.log(pH + eps) - pL * math.log(pL + eps) + (1 - pH + eps) * math.log(1 - pH + eps) - (1 - pL + eps) * math.log(1 - pL + eps)
+    pE = 1 / (1 + math.exp(pE / (pL - pH)))
+    quantile_order = (pE - pL) / (pH - pL)
+
+    return log_s2, quantile_order
+
+
+class QuestEngine:
+    """
+    QUEST (Watson & Pelli) with the same grid, prior, psychometric function and quantile rule
+    as psychopy's QuestHandler (method="quantile"), covering the part of its interface used by
+    QuestController: next(), addResponse(), mean(), sd(), quantile() and minVal/maxVal.
+
+    The posterior is kept as a log-pdf, so each response is one add of a slice of the
+    precomputed likelihood table and the pdf never underflows, however many trials are added.
+    branch() computes the outcome of a response without adding it, so it can be done ahead of
+    time and passed to addResponse() once the response is known.
+    """
+
+    def __init__(self, startVal, startValSd, pThreshold, beta=3.5, delta=0.01, gamma=0.5, grain=0.01, dim=500, minVal=None, maxVal=None):
+        if gamma > pThreshold:
+            gamma = 0.5  # as psychopy does
+        self.tGuess = startVal
+        self.grain = grain
+        self.dim = dim
+        self.minVal = minVal
+        self.maxVal = maxVal
+
+        self._log_s2, self.quantileOrder = likelihood_table(pThreshold, beta, delta, gamma, grain, dim)
+        self.x = np.arange(-dim / 2, dim / 2 + 1) * grain
+        self.log_pdf = -0.5 * (self.x / startValSd) ** 2
+
+        self.intensities = []
+        self.data = []
+        self._next_intensity = startVal
+
+    def next(self):
+        self.intensities.append(self._next_intensity)
+        return self._next_intensity
+
+    def branch(self, result, intensity):
+        """(posterior log-pdf, unclamped next intensity) if result were added at intensity."""
+        n = len(self.log_pdf)
+        d = round((max(-1e10, min(1e10, intensity)) - self.tGuess) / self.grain)
+        start = min(max(self.dim // 2 - d, 0), self._log_s2.shape[1] - n)  # clipped like psychopy
+        log_pdf = self.log_pdf + self._log_s2[int(result), start:start + n]
+        return log_pdf, self.quantile(log_pdf=log_pdf)
+
+    def addResponse(self, result, intensity=None, branch=None):
+        """branch: the result of branch(result, intensity) if already computed."""
+        if intensity is None:
+            intensity = self._next_intensity
+        else:
+            if self.intensities:
+                self.intensities.pop()  # replace the recommended intensity with the one used
+            self.intensities.append(intensity)
+
+        self.log_pdf, next_intensity = branch if branch is not None else self.branch(result, intensity)
+        self.data.append(result)
+
+        if self.maxVal is not None and next_intensity > self.maxVal:
+            next_intensity = self.maxVal
+        elif self.minVal is not None and next_intensity < self.minVal:
+            next_intensity = self.minVal
+        self._next_intensity = next_intensity
+
+    def _pdf(self, log_pdf=None):
+        log_pdf = self.log_pdf if log_pdf is None else log_pdf
+        return np.exp(log_pdf - log_pdf.max())
+
+    def mean(self):
+        pdf = self._pdf()
+        return self.tGuess + np.dot(pdf, self.x) / pdf.sum()
+
+    def sd(self):
+        pdf = self._pdf()
+        p = pdf.sum()
+        return math.sqrt(np.dot(pdf, self.x ** 2) / p - (np.dot(pdf, self.x) / p) ** 2)
+
+    def quantile(self, quantileOrder=None, log_pdf=None):
+        if quantileOrder is None:
+            quantileOrder = self.quantileOrder
+        pdf = self._pdf(log_pdf)
+        p = np.cumsum(pdf)
+        target = quantileOrder * p[-1]
+        if pdf.min() == 0:
+            # tails have underflowed: interpolate over the strictly increasing points, as psychopy does
+            index = np.nonzero(np.diff(p, prepend=-1))[0]
+            return self.tGuess + np.interp(target, p[index], self.x[index])
+
+        k = int(np.searchsorted(p, target, side="right"))
+        if k == 0:
+            return self.tGuess + self.x[0]
+        if k == len(p):
+            return self.tGuess + self.x[-1]
+        x0, x1, p0, p1 = self.x[k - 1], self.x[k], p[k - 1], p[k]
+        return self.tGuess + x0 + (target - p0) * (x1 - x0) / (p1 - p0)
+
+
+QUEST_ENGINES = ("native", "psychopy")
+
+# snapshot layout: header, then log-pdf (f8), handler intensities (f8), responses (i1) and
+# reset history rows of (trial number, start value) (f8)
+SNAPSHOT_MAGIC = b"QST1"
+SNAPSHOT_HEADER = struct.Struct("<4sIIIIIdddddd")
+
+
+def write_snapshot(path, data: bytes):
+    """
+    Write data to path via a temporary file that is synced to disk and then renamed over path,
+    so a crash or power loss leaves either the old or the new snapshot, never half of one.
+    """
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CheckpointWriter:
+    """
+    Writes snapshots to disk from a background thread, so checkpointing after a trial costs the
+    experiment loop only the in-memory snapshot. Only the latest snapshot is kept: if a new one
+    arrives while the previous is still being written, the one in between is skipped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._thread = threading.Thread(target=self._write_loop, daemon=True, name="QuestCheckpointWriter")
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def submit(self, data: bytes):
+        with self._cond:
+            self._pending = data
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the latest snapshot is on disk. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout=timeout)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                data, self._pending = self._pending, None
+                self._busy = True
+            try:
+                write_snapshot(self.path, data)
+            except OSError as e:
+                print(f"[QUEST] Could not write checkpoint {self.path}: {e}")
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
 
 class QuestController:
-    def __init__(self, start_val, max_weak, target):
+    """
+    QUEST staircase for the weak target intensity, reset to its current estimate every few
+    blocks (reset()).
+
+    With the native engine the whole state (posterior, trials since the last reset, reset
+    history) can be written to a compact binary snapshot and restored, e.g. to resume after a
+    crash or to start the main experiment from the practice estimate. With checkpoint_path
+    set, a snapshot is taken after every response, reset and max_weak update and written there
+    by a background CheckpointWriter.
+    """
+
+    def __init__(self, start_val, max_weak, target, engine="native", checkpoint_path=None):
+        if engine not in QUEST_ENGINES:
+            raise ValueError(f"Unknown QUEST engine '{engine}'. Choose one of {list(QUEST_ENGINES)}")
+        if checkpoint_path is not None and engine != "native":
+            raise ValueError("Checkpointing needs the native QUEST engine")
         self.max_weak = max_weak
         self.target = target
         self.start_val = start_val
         self.current_intensity = start_val
         self.n_resets = 0
+        self.engine = engine
+        self.n_trials = 0  # responses added, over all resets
+        self.reset_history = []  # (n_trials, start value) per reset
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self._checkpoint_writer = CheckpointWriter(self.checkpoint_path) if self.checkpoint_path else None
+        self._speculation = None  # (intensity, (branch if incorrect, branch if correct))
 
         self._make()
 
     def _make(self):
+        self._speculation = None
+        if self.engine == "native":
+            self.handler = QuestEngine(
+                startVal=self.start_val,
+                startValSd=1.0,
+                minVal=1.0,
+                maxVal=self.max_weak,
+                pThreshold=self.target,
+                beta=3.5,
+                gamma=0.5,
+                delta=0.01
+            )
+            return
+
+        from psychopy.data import QuestHandler
         self.handler = QuestHandler(
             startVal=self.start_val,
             startValSd=1.0,
@@ -27,18 +258,100 @@ class QuestController:
     def update_max_weak(self, new_max):
         self.max_weak = new_max
         self.handler.maxVal = new_max
-    
+        self._checkpoint()
+
     def next_intensity(self):
         val = self.handler.next()
         self.current_intensity = round(max(1.0, min(val, self.max_weak)), 1)
         return self.current_intensity
 
+    def speculate(self, intensity):
+        """
+        Compute the posterior and next intensity for both outcomes of the response to a target
+        at intensity, so that add_response() only has to pick one. Only the native engine
+        supports this; with psychopy it does nothing.
+        """
+        if self.engine == "native":
+            self._speculation = (intensity, (self.handler.branch(0, intensity), self.handler.branch(1, intensity)))
+
     def add_response(self, correct, intensity):
-        self.handler.addResponse(correct, intensity=intensity)
+        speculation, self._speculation = self._speculation, None
+        if speculation is not None and speculation[0] == intensity:
+            self.handler.addResponse(correct, intensity=intensity, branch=speculation[1][int(correct)])
+        else:
+            self.handler.addResponse(correct, intensity=intensity)
+        self.n_trials += 1
+        self._checkpoint()
 
     def reset(self, verbose=False):
         self.start_val = min(self.handler.mean(), self.max_weak)
         self._make()
         self.n_resets += 1
+        self.reset_history.append((self.n_trials, self.start_val))
+        self._checkpoint()
         if verbose:
-            print("QUEST has been reset to start value: ", self.start_val)
\ No newline at end of file
+            print("QUEST has been reset to start value: ", self.start_val)
+
+    # ---------------------------------------------------------
+    def snapshot(self) -> bytes:
+        """The full staircase state as bytes (native engine only)."""
+        if self.engine != "native":
+            raise ValueError("Only the native QUEST engine can be snapshotted")
+        handler = self.handler
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, len(handler.log_pdf), len(handler.intensities), len(handler.data), len(self.reset_history),
+            self.n_trials, self.start_val, self.max_weak, self.target, self.current_intensity, handler._next_intensity,
+            handler.grain,
+        )
+        return b"".join((
+            header,
+            handler.log_pdf.tobytes(),
+            np.asarray(handler.intensities, dtype="<f8").tobytes(),
+            np.asarray(handler.data, dtype="i1").tobytes(),
+            np.asarray(self.reset_history, dtype="<f8").tobytes(),
+        ))
+
+    @classmethod
+    def from_snapshot(cls, data: bytes, checkpoint_path=None) -> "QuestController":
+        (magic, n_grid, n_intensities, n_data, n_resets, n_trials, start_val, max_weak, target,
+         current_intensity, next_intensity, grain) = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a QUEST snapshot")
+
+        controller = cls(start_val, max_weak, target, checkpoint_path=checkpoint_path)
+        handler = controller.handler
+        if len(handler.log_pdf) != n_grid or handler.grain != grain:
+            raise ValueError("QUEST snapshot was made with a different grid")
+
+        offset = SNAPSHOT_HEADER.size
+        handler.log_pdf = np.frombuffer(data, dtype="<f8", count=n_grid, offset=offset).copy()
+        offset += 8 * n_grid
+        handler.intensities = np.frombuffer(data, dtype="<f8", count=n_intensities, offset=offset).tolist()
+        offset += 8 * n_intensities
+        handler.data = np.frombuffer(data, dtype="i1", count=n_data, offset=offset).tolist()
+        offset += n_data
+        history = np.frombuffer(data, dtype="<f8", count=2 * n_resets, offset=offset).reshape(n_resets, 2)
+        handler._next_intensity = next_intensity
+
+        controller.current_intensity = current_intensity
+        controller.n_trials = n_trials
+        controller.n_resets = n_resets
+        controller.reset_history = [(int(n), float(v)) for n, v in history]
+        return controller
+
+    def save(self, path):
+        """Write a snapshot to path now (see write_snapshot)."""
+        write_snapshot(path, self.snapshot())
+
+    @classmethod
+    def load(cls, path, checkpoint_path=None) -> "QuestController":
+        with open(path, "rb") as f:
+            return cls.from_snapshot(f.read(), checkpoint_path=checkpoint_path)
+
+    def _checkpoint(self):
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.submit(self.snapshot())
+
+    def flush_checkpoint(self, timeout: float = 5.0) -> bool:
+        """Wait until the latest checkpoint is on disk."""
+        return self._checkpoint_writer.flush(timeout) if self._checkpoint_writer else True
@@ -1,15 +1,133 @@
+import atexit
+import multiprocessing
+import os
 import threading
 import time
-from typing import Dict, Optional, Union
+from collections import deque
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Union
 
-import nidaqmx
-from nidaqmx.constants import LineGrouping
+import numpy as np
+
+try:
+    import nidaqmx
+    from nidaqmx.constants import READ_ALL_AVAILABLE, AcquisitionType, LineGrouping
+    from nidaqmx.errors import DaqError
+except ImportError:  # no NI-DAQmx installed, only SimulatedResponsePad can be used
+    nidaqmx = None
+
+
+READ_TIMEOUT_ERROR = -200284  # DAQmx error code when a read times out before samples are available
+BUFFER_OVERFLOW_ERROR = -200279  # DAQmx error code when samples were overwritten before they were read
+
+
+class PressEvent:
+    """A single button press: line, label, rise (press) and release timestamps (perf_counter)."""
+
+    __slots__ = ("line", "label", "rise_time", "release_time")
+
+    def __init__(self, line: int, label: str, rise_time: float, release_time: Optional[float] = None):
+        self.line = line
+        self.label = label
+        self.rise_time = rise_time
+        self.release_time = release_time
+
+    def __repr__(self):
+        return f"PressEvent(line={self.line}, label={self.label!r}, rise_time={self.rise_time:.6f}, release_time={self.release_time})"
+
+
+class PollRecorder:
+    """
+    Preallocated ring buffer of per-iteration timings of the response pad listener thread:
+    when the read started, how long the driver call took, the time since the previous read
+    started (the poll period) and how many lines changed since the previous read.
+    Once full, the oldest iterations are overwritten.
+    """
+
+    DTYPE = np.dtype([("start", "f8"), ("read_latency", "f8"), ("period", "f8"), ("n_changed", "i1")])
+    LATENCY_BINS_US = (0, 10, 20, 50, 100, 200, 500, 1000, 5000, np.inf)
+
+    def __init__(self, capacity: int = 100_000):
+        self.buffer = np.zeros(capacity, dtype=self.DTYPE)
+        self.n_recorded = 0
+        self._last_start = None
+
+    def record(self, start: float, read_latency: float, n_changed: int):
+        period = start - self._last_start if self._last_start is not None else np.nan
+        self._last_start = start
+        i = self.n_recorded % len(self.buffer)
+        self.buffer[i] = (start, read_latency, period, n_changed)
+        self.n_recorded += 1
+
+    def to_numpy(self):
+        """Recorded iterations in chronological order."""
+        capacity = len(self.buffer)
+        if self.n_recorded <= capacity:
+            return self.buffer[:self.n_recorded].copy()
+        start = self.n_recorded % capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def summary(self, max_gap_s: float) -> dict:
+        """
+        Period and read latency statistics, plus the iterations where an edge may have been missed:
+        more than one line changed within one poll, or the period exceeded max_gap_s (long enough
+        for a short tap to fall entirely between two reads).
+        """
+        iterations = self.to_numpy()
+        periods = iterations["period"][~np.isnan(iterations["period"])]
+        latencies_us = iterations["read_latency"] * 1e6
+        counts, _ = np.histogram(latencies_us, bins=self.LATENCY_BINS_US)
+
+        def _stats(values):
+            if len(values) == 0:
+                return {"p50": np.nan, "p99": np.nan, "max": np.nan}
+            return {"p50": float(np.median(values)), "p99": float(np.percentile(values, 99)), "max": float(values.max())}
+
+        return {
+            "n_iterations": self.n_recorded,
+            "n_kept": len(iterations),
+            "period_s": _stats(periods),
+            "read_latency_s": _stats(iterations["read_latency"]),
+            "read_latency_hist_us": dict(zip(self.LATENCY_BINS_US[:-1], counts.tolist())),
+            "multi_line_changes": int(np.sum(iterations["n_changed"] > 1)),
+            "long_gaps": int(np.sum(periods > max_gap_s)),
+        }
+
+    def save(self, path):
+        """Write the iterations to .npz or, for any other suffix, to CSV."""
+        iterations = self.to_numpy()
+        if str(path).endswith(".npz"):
+            np.savez(path, **{name: iterations[name] for name in self.DTYPE.names})
+        else:
+            np.savetxt(path, iterations, delimiter=",", fmt=["%.6f", "%.9f", "%.9f", "%d"],
+                       header=",".join(self.DTYPE.names), comments="")
+
+    def mark_resume(self):
+        """The listener was paused: the next read starts a new period instead of closing a long one."""
+        self._last_start = None
+
+    def clear(self):
+        self.n_recorded = 0
+        self._last_start = None
 
 
 class NIResponsePad:
     """
     Listener for a multi-line response pad on NI PCIe-6509.
     Supports edge detection and debounce for multiple successive presses.
+
+    Every press is kept, in order, in a bounded event queue as a PressEvent timestamped by
+    the poll thread. If more than max_events presses are waiting, the oldest are dropped
+    (counted in n_dropped).
+
+    With instrument=True the listener thread records the timing of every read in a
+    PollRecorder (poll_recorder) and prints a summary on stop_listener.
+
+    The task and listener thread are created by the first start_listener() and then kept for
+    the lifetime of the process: stop_listener() only pauses the listener and start_listener()
+    resumes it. close() tears everything down; it is registered to run at exit. If the listener
+    thread dies on a read error, the error is kept in listener_error and wait_for_response()
+    raises instead of waiting for presses that can no longer arrive.
     """
 
     def __init__(
@@ -21,6 +139,9 @@ class NIResponsePad:
         poll_interval_s: float = 0.0005,
         debounce_ms: int = 30,
         timestamp_responses: bool = False,
+        max_events: int = 256,
+        instrument: bool = False,
+        instrument_capacity: int = 100_000,
     ):
         self.device = device
         self.port = port
@@ -33,71 +154,170 @@ class NIResponsePad:
         self.mapping = mapping or {i: str(i) for i in range(num_lines)}
 
         self.active = False
-        self._task: Optional[nidaqmx.Task] = None
+        self._task = None
         self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()  # cleared while paused
+        self._closed = False
+        self.listener_error: Optional[BaseException] = None
 
         self._lock = threading.Lock()
-        self._last_press_label: Optional[str] = None
-        self._last_press_time: Optional[float] = None
-        self._last_line_time = {i: 0.0 for i in range(num_lines)}
-        self._last_bits = [0] * num_lines  # track previous line states
+        self._new_event = threading.Condition(self._lock)  # notified on every press
+        self._events: deque = deque(maxlen=max_events)
+        self._open_presses: List[Optional[PressEvent]] = [None] * num_lines  # press still held down per line
+        self.n_dropped = 0
+
+        # decoder state lives in fixed-size structures, so a poll allocates nothing
+        self._line_mask = (1 << num_lines) - 1
+        self._rise_lut, self._fall_lut = self.make_edge_tables(num_lines)
+        self._last_line_time = [0.0] * num_lines  # time of last accepted press per line (debounce)
+        self._last_mask = 0  # previous raw line states
 
-        print(f"NIResponsePad initialized on {self.device}/{self.port} with {self.num_lines} lines")
+        self.poll_recorder = PollRecorder(instrument_capacity) if instrument else None
+
+        print(f"{type(self).__name__} initialized on {self.device}/{self.port} with {self.num_lines} lines")
 
     # ---------------------------------------------------------
     def _make_line_string(self):
         # e.g., "Dev1/port6/line0:3"
         return f"{self.device}/{self.port}/line0:{self.num_lines - 1}"
 
+    # ---------------------------------------------------------
+    def _open_task(self):
+        line_string = self._make_line_string()
+        task = nidaqmx.Task(new_task_name="NI Response Pad Task")
+        task.di_channels.add_di_chan(
+            line_string,
+            line_grouping=LineGrouping.CHAN_FOR_ALL_LINES
+        )
+        return task
+
     # ---------------------------------------------------------
     def _poll_loop(self):
         # Cache the read method for performance
         read = self._task.read
+        recorder = self.poll_recorder
 
         while self.active:
+            if not self._running.is_set():
+                self._running.wait()
+                self._resync()
+                if recorder is not None:
+                    recorder.mark_resume()
+                continue
+
+            t_start = time.perf_counter()
             try:
                 raw_val = read()  # integer bitmask on PCIe-6509
-            except Exception:
+            except Exception as e:
+                self._listener_failed(e)
                 break
 
             t = time.perf_counter()
-            bits = [(raw_val >> i) & 1 for i in range(self.num_lines)]
-
-            for idx, bit in enumerate(bits):
-                # Rising edge detection
-                if bit and self._last_bits[idx] == 0:
-                    if (t - self._last_line_time[idx]) >= self.debounce_s:
-                        label = self.mapping[idx]
-                        with self._lock:
-                            self._last_press_label = label
-                            self._last_press_time = t
-                        self._last_line_time[idx] = t
-
-            self._last_bits = bits
+            if recorder is not None:
+                recorder.record(t_start, t - t_start, self._count_changed(raw_val))
+            self._process_sample(raw_val, t)
             time.sleep(self.poll_interval_s)
 
+    def _resync(self):
+        """On resume: lines already held down are not new presses."""
+        try:
+            self._last_mask = self._task.read() & self._line_mask
+        except Exception:
+            pass
+
+    def _listener_failed(self, error: BaseException):
+        print(f"[RESPONSE] Listener stopped: {error!r}")
+        with self._new_event:
+            self.listener_error = error
+            self._new_event.notify_all()  # wake wait_for_response
+
+    def _count_changed(self, raw_val: int) -> int:
+        return bin((raw_val ^ self._last_mask) & self._line_mask).count("1")
+
+    @staticmethod
+    def make_edge_tables(num_lines: int):
+        """
+        Precompute the rising- and falling-edge lines for every (previous mask, current mask) pair.
+        Both tables are flat lists indexed by (previous << num_lines) | current.
+        """
+        size = 1 << num_lines
+        rise_lut = []
+        fall_lut = []
+        for prev in range(size):
+            for cur in range(size):
+                rise_lut.append(tuple(i for i in range(num_lines) if (cur & ~prev) >> i & 1))
+                fall_lut.append(tuple(i for i in range(num_lines) if (prev & ~cur) >> i & 1))
+        return rise_lut, fall_lut
+
+    def _process_sample(self, raw_val: int, t: float):
+        """Edge detection and debounce for one reading of the port."""
+        raw_val &= self._line_mask
+        prev = self._last_mask
+        if raw_val == prev:
+            return  # no line changed
+
+        idx = (prev << self.num_lines) | raw_val
+
+        # Rising edge detection
+        for line in self._rise_lut[idx]:
+            if (t - self._last_line_time[line]) >= self.debounce_s:
+                self._push_event(PressEvent(line, self.mapping[line], t))
+                self._last_line_time[line] = t
+
+        # Falling edge: release of the press still held on this line
+        for line in self._fall_lut[idx]:
+            self._release_press(line, t)
+
+        self._last_mask = raw_val
+
     # ---------------------------------------------------------
     def start_listener(self):
-        if self._task is not None:
-            return
+        """Start listening; the task and thread are only created the first time."""
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} has been closed")
 
-        line_string = self._make_line_string()
-        self._task = nidaqmx.Task(new_task_name="NI Response Pad Task")
-        self._task.di_channels.add_di_chan(
-            line_string,
-            line_grouping=LineGrouping.CHAN_FOR_ALL_LINES
-        )
+        if self._task is None:
+            self._task = self._open_task()
+            self.active = True
+            self._running.set()  # not a resume: nothing to resync on the first read
+            self._thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
 
-        self.active = True
-        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
-        self._thread.start()
+        self.resume()
 
-    # ---------------------------------------------------------
     def stop_listener(self):
+        """Stop delivering presses. The task and thread are kept for the next start_listener()."""
+        self.pause()
+
+        if self.poll_recorder is not None and self.poll_recorder.n_recorded:
+            self.print_instrumentation_summary()
+
+    def pause(self):
+        """The listener thread blocks until resume(); presses in the meantime are not queued."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def close(self):
+        """Stop the listener thread and close the task. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
         self.active = False
+        self._running.set()  # wake a paused thread so it can see active is False
 
         if self._thread:
-            self._thread.join(timeout=0.1)
+            self._thread.join(timeout=2.0)
+            if self._thread.is_alive():
+                # never close the task under a thread that may still be reading it
+                print("[RESPONSE] Listener thread did not stop; leaving the task open.")
+                return
             self._thread = None
 
         if self._task:
@@ -107,27 +327,564 @@ class NIResponsePad:
                 pass
             self._task = None
 
+    # ---------------------------------------------------------
+    def instrumentation_summary(self) -> dict:
+        """Summary of the recorded poll loop timings (see PollRecorder.summary)."""
+        if self.poll_recorder is None:
+            raise RuntimeError("Instrumentation is off; construct the response pad with instrument=True.")
+        return self.poll_recorder.summary(max_gap_s=self.debounce_s)
+
+    def print_instrumentation_summary(self):
+        summary = self.instrumentation_summary()
+        period, latency = summary["period_s"], summary["read_latency_s"]
+        print(f"[RESPONSE] {summary['n_iterations']} reads ({summary['n_kept']} kept)")
+        print(f"[RESPONSE] period:       p50 {period['p50'] * 1e3:.3f} ms | p99 {period['p99'] * 1e3:.3f} ms | max {period['max'] * 1e3:.3f} ms")
+        print(f"[RESPONSE] read latency: p50 {latency['p50'] * 1e6:.1f} us | p99 {latency['p99'] * 1e6:.1f} us | max {latency['max'] * 1e6:.1f} us")
+        print("[RESPONSE] read latency histogram (us): "
+              + ", ".join(f">={edge:g}: {count}" for edge, count in summary["read_latency_hist_us"].items()))
+        print(f"[RESPONSE] suspected missed edges: {summary['multi_line_changes']} multi-line changes, "
+              f"{summary['long_gaps']} periods > {self.debounce_s * 1e3:.0f} ms")
+
+    def dump_instrumentation(self, path):
+        """Write the recorded poll loop timings to path (.npz, or CSV for any other suffix)."""
+        if self.poll_recorder is None:
+            raise RuntimeError("Instrumentation is off; construct the response pad with instrument=True.")
+        self.poll_recorder.save(path)
+
+    # ---------------------------------------------------------
+    def _push_event(self, event: PressEvent):
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.n_dropped += 1
+            self._events.append(event)
+            self._new_event.notify_all()
+        self._open_presses[event.line] = event
+
+    def _release_press(self, line: int, t: float):
+        press = self._open_presses[line]
+        if press is not None:
+            press.release_time = t
+            self._open_presses[line] = None
+
     # ---------------------------------------------------------
     def get_response(self):
         """
+        Removes and returns the oldest press.
+
         Returns:
           - If timestamp_responses is False: label string or None
           - If True: (label, timestamp) or None
         """
+        if not self._events:  # no lock needed to see that nothing is waiting
+            return None
+
         with self._lock:
-            label = self._last_press_label
-            ts = self._last_press_time
-            self._last_press_label = None
-            self._last_press_time = None
+            event = self._events.popleft() if self._events else None
 
-        if label is None:
+        if event is None:
             return None
         if self.timestamp_responses:
-            return (label, ts)
-        return label
-    
+            return (event.label, event.rise_time)
+        return event.label
+
+    def drain(self) -> List[PressEvent]:
+        """Removes and returns all waiting presses, oldest first."""
+        if not self._events:
+            return []
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def peek(self) -> Optional[PressEvent]:
+        """Returns the oldest waiting press without removing it."""
+        if not self._events:
+            return None
+        with self._lock:
+            return self._events[0] if self._events else None
+
+    def first_press_after(self, t: float, consume: bool = True) -> Optional[PressEvent]:
+        """
+        Returns the first press whose rise time is at or after perf_counter time t.
+        With consume=True that press and every press before it are removed from the queue.
+        """
+        if not self._events:
+            return None
+
+        with self._lock:
+            return self._first_press_after(t, consume)
+
+    def _first_press_after(self, t: Optional[float], consume: bool) -> Optional[PressEvent]:
+        # must be called with self._lock held
+        for i, event in enumerate(self._events):
+            if t is None or event.rise_time >= t:
+                if consume:
+                    for _ in range(i + 1):
+                        self._events.popleft()
+                return event
+        if consume:
+            self._events.clear()  # all waiting presses came before t
+        return None
+
+    def wait_for_response(self, timeout: Optional[float] = None, deadline: Optional[float] = None, after: Optional[float] = None) -> Optional[PressEvent]:
+        """
+        Blocks until a press arrives, then removes and returns it. Sleeps on a condition
+        variable instead of polling, so waiting costs no CPU.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Give up after this many seconds.
+        deadline : float, optional
+            Give up at this perf_counter time (whichever of timeout/deadline comes first).
+        after : float, optional
+            Only accept presses with a rise time at or after this perf_counter time;
+            earlier presses are discarded.
+
+        Returns
+        -------
+        PressEvent or None if no press arrived in time.
+
+        Raises
+        ------
+        RuntimeError
+            If the listener has stopped on an error and no press is waiting.
+        """
+        if timeout is not None:
+            end = time.perf_counter() + timeout
+            deadline = end if deadline is None else min(deadline, end)
+
+        with self._new_event:
+            while True:
+                event = self._first_press_after(after, consume=True)
+                if event is not None:
+                    return event
+                if self.listener_error is not None:
+                    raise RuntimeError("Response pad listener has stopped") from self.listener_error
+
+                if deadline is None:
+                    self._new_event.wait()
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return None
+                    self._new_event.wait(remaining)
+
     def reset_response(self):
         """Clears any stored response without returning it."""
         with self._lock:
-            self._last_press_label = None
-            self._last_press_time = None
+            self._events.clear()
+
+
+class NIChangeDetectionResponsePad(NIResponsePad):
+    """
+    Response pad backend using DAQmx change detection instead of software polling.
+
+    The task is configured with change detection timing on the rising and falling edges of
+    all lines, so the device only produces a sample when a line changes. The listener thread
+    blocks inside the driver (without holding the GIL) until samples arrive, reads everything
+    that is available in one call and timestamps it when the read returns. There is no poll
+    period or sleep overshoot; timing is limited by the driver's interrupt latency.
+
+    The PCIe-6509 has no sample clock, so it cannot timestamp the samples itself; all
+    samples returned by one read share that read's timestamp.
+
+    If the buffer overflows (e.g. a long pause with a line toggling), the task is restarted,
+    which discards the buffered changes; the line states are then taken as they were before.
+    """
+
+    def __init__(self, *args, read_timeout_s: float = 0.1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_timeout_s = read_timeout_s
+
+    def _open_task(self):
+        line_string = self._make_line_string()
+        task = nidaqmx.Task(new_task_name="NI Response Pad Change Detection Task")
+        task.di_channels.add_di_chan(
+            line_string,
+            line_grouping=LineGrouping.CHAN_FOR_ALL_LINES
+        )
+        task.timing.cfg_change_detection_timing(
+            rising_edge_chan=line_string,
+            falling_edge_chan=line_string,
+            sample_mode=AcquisitionType.CONTINUOUS,
+        )
+        task.start()
+        return task
+
+    def _resync(self):
+        # changes detected while paused are still in the buffer; skip them
+        samples = self._task.read(number_of_samples_per_channel=READ_ALL_AVAILABLE, timeout=0)
+        if samples:
+            self._last_mask = samples[-1] & self._line_mask
+
+    def _restart_task(self):
+        """Stop and start the task, which empties the buffer."""
+        self._task.stop()
+        self._task.start()
+
+    def _poll_loop(self):
+        read = self._task.read
+        recorder = self.poll_recorder
+
+        while self.active:
+            try:
+                if not self._running.is_set():
+                    self._running.wait()
+                    self._resync()
+                    if recorder is not None:
+                        recorder.mark_resume()
+                    continue
+
+                t_start = time.perf_counter()
+                # blocks in the driver until at least one change has been detected
+                samples = read(number_of_samples_per_channel=1, timeout=self.read_timeout_s)
+                t = time.perf_counter()
+                # plus anything else that arrived in the meantime, in bulk
+                samples += read(number_of_samples_per_channel=READ_ALL_AVAILABLE, timeout=0)
+            except DaqError as e:
+                if e.error_code == READ_TIMEOUT_ERROR:
+                    continue  # no change within read_timeout_s
+                if e.error_code != BUFFER_OVERFLOW_ERROR:
+                    self._listener_failed(e)
+                    break
+                print("[RESPONSE] Change detection buffer overflowed; restarting the task.")
+                try:
+                    self._restart_task()
+                except Exception as restart_error:
+                    self._listener_failed(restart_error)
+                    break
+                continue
+            except Exception as e:
+                self._listener_failed(e)
+                break
+
+            if recorder is not None:
+                # one entry per read, like the polling backend: the read "latency" includes the
+                # wait for the change, and n_changed counts every line that changed in the batch,
+                # since all of its samples share one timestamp
+                changed, prev = 0, self._last_mask
+                for raw_val in samples:
+                    changed |= raw_val ^ prev
+                    prev = raw_val
+                recorder.record(t_start, t - t_start, bin(changed & self._line_mask).count("1"))
+            for raw_val in samples:
+                self._process_sample(raw_val, t)
+
+
+class SimulatedDITask:
+    """Stand-in for a nidaqmx DI task: read() returns the bitmask set with set_mask()."""
+
+    def __init__(self):
+        self.mask = 0
+
+    def set_mask(self, mask: int):
+        self.mask = mask
+
+    def read(self):
+        return self.mask
+
+    def close(self):
+        pass
+
+
+class SimulatedResponsePad(NIResponsePad):
+    """
+    Response pad without NI hardware, for testing and dry runs. Lines are driven with
+    press()/release() or set_mask(); everything else (polling, debounce, event queue) is the
+    same as NIResponsePad.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.sim_task = SimulatedDITask()
+        super().__init__(*args, **kwargs)
+
+    def _open_task(self):
+        return self.sim_task
+
+    def set_mask(self, mask: int):
+        self.sim_task.set_mask(mask)
+
+    def press(self, line: int):
+        self.sim_task.set_mask(self.sim_task.mask | (1 << line))
+
+    def release(self, line: int):
+        self.sim_task.set_mask(self.sim_task.mask & ~(1 << line))
+
+    def tap(self, line: int, duration_s: float = 0.05):
+        """Press and release a line from a background thread, like a participant would."""
+        def _tap():
+            self.press(line)
+            time.sleep(duration_s)
+            self.release(line)
+        threading.Thread(target=_tap, daemon=True).start()
+
+
+# ---------------------------------------------------------
+# Polling in a separate process
+# ---------------------------------------------------------
+EDGE_DTYPE = np.dtype([("time", "f8"), ("line", "i4"), ("rising", "i4")])
+_HEADER_SLOTS = 2  # int64 write count, int64 simulated line mask
+
+
+def _edge_ring_views(buf, capacity: int):
+    """Header and edge record views onto the shared memory block (no copies)."""
+    header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=buf)
+    edges = np.ndarray((capacity,), dtype=EDGE_DTYPE, buffer=buf, offset=header.nbytes)
+    return header, edges
+
+
+class SharedMaskDITask(SimulatedDITask):
+    """SimulatedDITask whose bitmask lives in the shared header, so the parent process can drive it."""
+
+    def __init__(self, header):
+        self.header = header
+
+    @property
+    def mask(self):
+        return int(self.header[1])
+
+    def set_mask(self, mask: int):
+        self.header[1] = mask
+
+
+class _EdgePublisher:
+    """
+    Mixin for the pad that runs inside the poller process: instead of queueing PressEvents it
+    writes every accepted press and its release into the shared edge ring and signals the parent.
+    Single producer, single consumer: the record is written before the write count is advanced.
+    """
+
+    def __init__(self, header, edges, new_edge, **kwargs):
+        self._header = header
+        self._edges = edges
+        self._new_edge = new_edge
+        self._pressed = [False] * kwargs.get("num_lines", 4)
+        super().__init__(**kwargs)
+
+    def _open_task(self):
+        if isinstance(self, SimulatedResponsePad):
+            return SharedMaskDITask(self._header)
+        return super()._open_task()
+
+    def _publish(self, t: float, line: int, rising: bool):
+        n = int(self._header[0])
+        self._edges[n % len(self._edges)] = (t, line, rising)
+        self._header[0] = n + 1
+        self._new_edge.release()
+
+    def _push_event(self, event: PressEvent):
+        self._pressed[event.line] = True
+        self._publish(event.rise_time, event.line, True)
+
+    def _release_press(self, line: int, t: float):
+        if self._pressed[line]:
+            self._pressed[line] = False
+            self._publish(t, line, False)
+
+
+def _attach_untracked(shm_name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to the parent's shared memory block without registering it with the resource
+    tracker: the parent owns and unlinks the block, and the tracker shared with a spawned
+    child must not be told about it twice.
+    """
+    try:
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:  # track was added in Python 3.13
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=shm_name)
+    finally:
+        resource_tracker.register = register
+
+
+def _run_shared_memory_poller(shm_name: str, capacity: int, backend: str, pad_kwargs: dict, ready, stop, new_edge):
+    """Entry point of the poller process."""
+    shm = _attach_untracked(shm_name)
+    header, edges = _edge_ring_views(shm.buf, capacity)
+
+    pad_cls = type(f"Published{RESPONSE_PAD_BACKENDS[backend].__name__}", (_EdgePublisher, RESPONSE_PAD_BACKENDS[backend]), {})
+    pad = pad_cls(header, edges, new_edge, **pad_kwargs)
+    pad.start_listener()
+    ready.set()
+    try:
+        while not stop.wait(0.1):
+            if pad.listener_error is not None:
+                break  # exit, so the parent sees the process die
+    finally:
+        failed = pad.listener_error is not None
+        pad.stop_listener()
+        pad.close()
+        del header, edges, pad  # release the views before closing the block
+        shm.close()
+    if failed:
+        raise SystemExit(1)
+
+
+class NIProcessResponsePad(NIResponsePad):
+    """
+    Response pad whose poll loop runs in a separate process, so its timing does not depend on
+    what the experiment's interpreter is doing (Tk updates, QUEST, serial writes all hold the GIL).
+
+    The poller process runs the poller_backend pad ("poll", "change_detection" or "simulated")
+    with its own decoder and debounce, and publishes every press and release, timestamped with
+    perf_counter in that process, into a ring of shm_capacity edge records in shared memory.
+    perf_counter is a system-wide monotonic clock, so these timestamps compare directly with
+    the experiment's. A thread in this process blocks on a semaphore and turns the edges back
+    into PressEvents in the usual event queue; its scheduling only delays delivery, not the
+    timestamps. If the parent falls more than shm_capacity edges behind, the oldest are lost
+    (counted in n_dropped). The poller keeps running while paused; only delivery is gated.
+
+    The first start_listener() waits up to startup_timeout_s for the poller to be reading
+    (None waits as long as it takes); spawning an interpreter and opening the task can take
+    several seconds on a loaded machine.
+
+    With instrument=True the timings are recorded and summarised in the poller process.
+    """
+
+    def __init__(self, *args, poller_backend: str = "poll", shm_capacity: int = 1024, startup_timeout_s: Optional[float] = 10.0, **kwargs):
+        if args:
+            raise TypeError("NIProcessResponsePad only takes keyword arguments")
+        if poller_backend not in RESPONSE_PAD_BACKENDS or poller_backend == "process":
+            raise ValueError(f"Unknown poller backend '{poller_backend}'")
+        super().__init__(**kwargs)
+        self.poller_backend = poller_backend
+        self.shm_capacity = shm_capacity
+        self.startup_timeout_s = startup_timeout_s
+        self._pad_kwargs = kwargs
+        self.poll_recorder = None  # lives in the poller process
+
+        self._shm = None
+        self._header = None
+        self._edges = None
+        self._process = None
+        self._ready = None
+        self._stop = None
+        self._new_edge = None
+        self._n_read = 0
+
+    # ---------------------------------------------------------
+    def start_listener(self):
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} has been closed")
+        if self._process is None:
+            self._start_poller()
+            atexit.register(self.close)
+        self.resume()
+
+    def _start_poller(self):
+        ctx = multiprocessing.get_context("spawn")  # same behaviour on Windows and Linux
+        self._shm = shared_memory.SharedMemory(create=True, size=8 * _HEADER_SLOTS + EDGE_DTYPE.itemsize * self.shm_capacity)
+        self._header, self._edges = _edge_ring_views(self._shm.buf, self.shm_capacity)
+        self._header[:] = 0
+        self._n_read = 0
+        self._ready = ctx.Event()
+        self._stop = ctx.Event()
+        self._new_edge = ctx.Semaphore(0)
+
+        self._process = ctx.Process(
+            target=_run_shared_memory_poller,
+            args=(self._shm.name, self.shm_capacity, self.poller_backend, self._pad_kwargs, self._ready, self._stop, self._new_edge),
+            daemon=True,
+        )
+        self._process.start()
+        # the first presses of a trial must not fall in the poller's start-up
+        while not self._ready.wait(timeout=1.0 if self.startup_timeout_s is None else self.startup_timeout_s):
+            if self.startup_timeout_s is not None or not self._process.is_alive():
+                exitcode = self._process.exitcode
+                self.close()
+                if exitcode is not None:
+                    raise RuntimeError(f"Response pad poller process exited with code {exitcode} during start-up")
+                raise RuntimeError(f"Response pad poller process did not start within {self.startup_timeout_s} s")
+
+        self.active = True
+        self._thread = threading.Thread(target=self._consume_loop, daemon=True)
+        self._thread.start()
+
+    # ---------------------------------------------------------
+    def close(self):
+        """Stop the poller process and release the shared memory. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._process is None:
+            return
+
+        self.active = False  # before stopping the poller, so the consumer does not report its exit
+        if self._process.is_alive():  # a killed poller can leave the event's lock held
+            self._stop.set()
+        self._process.join(timeout=2.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+        self._new_edge.release()  # wake the consumer thread
+        if self._thread:
+            self._thread.join(timeout=0.5)
+            self._thread = None
+        self._consume()  # anything published after the last wake-up
+
+        self._header = self._edges = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    # ---------------------------------------------------------
+    def _consume_loop(self):
+        process = self._process
+        while self.active:
+            if self._new_edge.acquire(timeout=0.1):
+                self._consume()
+            elif not process.is_alive() and self.active:
+                self._consume()
+                self._listener_failed(RuntimeError(f"Response pad poller process exited with code {process.exitcode}"))
+                break
+
+    def _consume(self):
+        n_written = int(self._header[0])
+        if n_written - self._n_read > self.shm_capacity:
+            self.n_dropped += n_written - self._n_read - self.shm_capacity
+            self._n_read = n_written - self.shm_capacity
+
+        edges = self._edges
+        for n in range(self._n_read, n_written):
+            t, line, rising = edges[n % self.shm_capacity].item()
+            if rising:
+                if self._running.is_set():  # presses while paused are not queued
+                    self._push_event(PressEvent(line, self.mapping[line], t))
+            else:
+                self._release_press(line, t)
+        self._n_read = n_written
+
+    # ---------------------------------------------------------
+    def set_mask(self, mask: int):
+        """Drive the lines of a "simulated" poller process."""
+        self._header[1] = mask
+
+    def press(self, line: int):
+        self._header[1] |= 1 << line
+
+    def release(self, line: int):
+        self._header[1] &= ~(1 << line)
+
+
+RESPONSE_PAD_BACKENDS = {
+    "poll": NIResponsePad,
+    "change_detection": NIChangeDetectionResponsePad,
+    "simulated": SimulatedResponsePad,
+    "process": NIProcessResponsePad,
+}
+
+
+def make_response_pad(backend: Union[str, None] = None, **kwargs) -> NIResponsePad:
+    """
+    Construct the response pad for the given backend ("poll", "change_detection", "simulated" or "process").
+    Defaults to the CEREBELLOPM_RESPONSE_BACKEND environment variable, or "poll".
+    """
+    backend = backend or os.environ.get("CEREBELLOPM_RESPONSE_BACKEND", "poll")
+    if backend not in RESPONSE_PAD_BACKENDS:
+        raise ValueError(f"Unknown response pad backend '{backend}'. Choose one of {list(RESPONSE_PAD_BACKENDS)}")
+    return RESPONSE_PAD_BACKENDS[backend](**kwargs)
@@ -0,0 +1,330 @@
+"""
+Persistent stimulator daemon that keeps the SGC serial ports and NI trigger tasks open
+for a whole session.
+
+Start it once at the beginning of the session (from the repository root):
+
+    python -m utils.stimulator_daemon
+
+and run the experiment scripts with CEREBELLOPM_SGC_BACKEND=daemon (and optionally
+CEREBELLOPM_TRIGGER_BACKEND=daemon). The scripts then talk to the daemon through
+SGCDaemonClient, which has the same interface as BaseSGCConnector. The daemon knows each
+device's current intensity and pulse duration, so a new script does not replay the
+stepping-stone commands from start_intensity=1 or resend an unchanged pulse duration.
+
+Stop it with Ctrl+C, SIGTERM or, from another terminal:
+
+    python -m utils.stimulator_daemon --shutdown
+
+The daemon listens on a Unix socket (a named pipe on Windows). Clients authenticate with a
+key taken from the CEREBELLOPM_DAEMON_KEY environment variable or, if that is not set, from
+~/.cerebellopm/daemon.key, which is created with a random key (readable only by the user)
+the first time it is needed.
+"""
+
+import argparse
+import os
+import secrets
+import signal
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Union
+
+from .SGC_connector import BaseSGCConnector
+
+SOCKET_ENV = "CEREBELLOPM_DAEMON_SOCKET"
+AUTHKEY_ENV = "CEREBELLOPM_DAEMON_KEY"
+AUTHKEY_PATH = Path.home() / ".cerebellopm" / "daemon.key"
+
+
+def default_address() -> str:
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+    if os.name == "nt":
+        return r"\\.\pipe\cerebellopm-stimulator"
+    return "/tmp/cerebellopm-stimulator.sock"
+
+
+def authkey() -> bytes:
+    """The key shared by the daemon and its clients (see the module docstring)."""
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode("utf-8")
+
+    AUTHKEY_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        fd = os.open(AUTHKEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return AUTHKEY_PATH.read_bytes().strip()
+    with os.fdopen(fd, "wb") as file:
+        key = secrets.token_hex(32).encode("ascii")
+        file.write(key)
+    return key
+
+
+class StimulatorDaemon:
+    """
+    Owns the connectors (and trigger tasks) and executes requests from clients.
+
+    Requests are tuples (op, name, *args); every request gets a reply ("ok", result) or
+    ("error", message). Each connector has its own lock, so a slow intensity change on one
+    device does not hold up pulses on another, and triggers are raised without waiting for
+    the lines to be lowered again. A ("shutdown",) request, SIGTERM or Ctrl+C stops the
+    daemon and removes its socket.
+    """
+
+    def __init__(self, connectors, address: Union[str, None] = None):
+        self.connectors = connectors
+        self.address = address or default_address()
+        self.pulse_durations: dict = {}
+        self.trigger_delays: dict = {}
+        self._locks = {name: threading.Lock() for name in connectors}
+        self._running = False
+        self._authkey = authkey()
+
+    def handle(self, op, name=None, *args):
+        if op == "ping":
+            return "pong"
+        if op == "shutdown":
+            return None  # stopped by _serve_client once the reply is sent
+        if op == "state":
+            return {
+                n: {
+                    "intensity": c.current_intensity,
+                    "pulse_duration": self.pulse_durations.get(n),
+                    "trigger_delay": self.trigger_delays.get(n),
+                }
+                for n, c in self.connectors.items()
+            }
+        if op == "trigger":
+            from .triggers_nidaqmx import setParallelData
+            return setParallelData(*args, blocking=False)
+
+        connector = self.connectors[name]
+        with self._locks[name]:
+            return self._handle_connector(op, name, connector, *args)
+
+    def _handle_connector(self, op, name, connector, *args):
+        if op == "change_intensity":
+            connector.change_intensity(*args)
+            return connector.current_intensity
+        if op == "set_pulse_duration":
+            if self.pulse_durations.get(name) != args[0]:
+                connector.set_pulse_duration(*args)
+                self.pulse_durations[name] = args[0]
+            return None
+        if op == "set_trigger_delay":
+            if self.trigger_delays.get(name) != args[0]:
+                connector.set_trigger_delay(*args)
+                self.trigger_delays[name] = args[0]
+            return None
+        if op == "send_pulse":
+            connector.send_pulse()
+            return time.perf_counter()
+        if op == "send_bytes":
+            connector.send_bytes(*args)
+            return None
+        if op == "wakeup":
+            connector.wakeup()
+            return None
+
+        raise ValueError(f"Unknown request '{op}'")
+
+    def _serve_client(self, conn):
+        with conn:
+            while self._running:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    reply = ("ok", self.handle(*request))
+                except Exception as e:
+                    reply = ("error", f"{type(e).__name__}: {e}")
+                conn.send(reply)
+                if request[0] == "shutdown":
+                    self.stop()
+                    break
+
+    def stop(self):
+        """Stop accepting clients; serve_forever() then returns and removes the socket."""
+        if not self._running:
+            return
+        print("[DAEMON] Shutting down")
+        self._running = False
+        try:
+            Client(self.address, authkey=self._authkey).close()  # wake the blocking accept()
+        except (OSError, AuthenticationError):
+            pass
+
+    def _already_running(self) -> bool:
+        try:
+            Client(self.address, authkey=self._authkey).close()
+        except AuthenticationError:
+            return True  # someone answers, just with another key
+        except OSError:
+            return False
+        return True
+
+    def _handle_signal(self, signum, frame):
+        # the main thread is blocked in accept(), so it cannot wake itself with stop()
+        self._running = False
+        raise SystemExit(0)
+
+    def serve_forever(self):
+        if self._already_running():
+            raise RuntimeError(f"A stimulator daemon is already listening on {self.address}")
+        if os.name != "nt" and os.path.exists(self.address):
+            os.remove(self.address)  # left behind by a daemon that did not shut down cleanly
+
+        # open the serial ports before accepting clients
+        for name, connector in self.connectors.items():
+            print(f"[DAEMON] {name}: intensity {connector.current_intensity}")
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self._handle_signal)
+
+        self._running = True
+        try:
+            with Listener(self.address, authkey=self._authkey) as listener:
+                print(f"[DAEMON] Listening on {self.address}")
+                backoff = 0.01
+                while self._running:
+                    try:
+                        conn = listener.accept()
+                    except AuthenticationError as e:
+                        print(f"[DAEMON] Rejected client: {e}")
+                        continue
+                    except OSError as e:
+                        if not self._running:
+                            break
+                        print(f"[DAEMON] accept() failed: {e}, retrying in {backoff:.2f} s")
+                        time.sleep(backoff)
+                        backoff = min(backoff * 2, 1.0)
+                        continue
+                    backoff = 0.01
+                    if not self._running:  # the wake-up connection from stop()
+                        conn.close()
+                        break
+                    threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._running = False
+            if os.name != "nt" and os.path.exists(self.address):
+                os.remove(self.address)
+            print("[DAEMON] Stopped")
+
+
+class StimulatorClient:
+    """
+    Connection to a running StimulatorDaemon. Requests for different connectors (and for
+    triggers) go over separate connections, so they do not wait for each other.
+    """
+
+    def __init__(self, address: Union[str, None] = None):
+        self.address = address or default_address()
+        self._conns = {}  # connector name (None for triggers and state) -> (connection, lock)
+        self._conns_lock = threading.Lock()
+        self._connection(None)  # fail here if no daemon is running
+
+    def _connection(self, name):
+        with self._conns_lock:
+            if name not in self._conns:
+                self._conns[name] = (Client(self.address, authkey=authkey()), threading.Lock())
+            return self._conns[name]
+
+    def request(self, op, name=None, *args):
+        conn, lock = self._connection(name)
+        with lock:
+            conn.send((op, name, *args))
+            status, result = conn.recv()
+        if status == "error":
+            raise RuntimeError(f"Stimulator daemon: {result}")
+        return result
+
+    def trigger(self, code) -> float:
+        """Raise the trigger lines in the daemon; returns the perf_counter time of the rising edge."""
+        return self.request("trigger", None, code)
+
+    def shutdown(self):
+        """Ask the daemon to stop, then close this client."""
+        self.request("shutdown")
+        self.close()
+
+    def close(self):
+        with self._conns_lock:
+            for conn, _ in self._conns.values():
+                conn.close()
+            self._conns.clear()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def shared_client() -> StimulatorClient:
+    """One connection per process, shared by all SGCDaemonClients and the trigger backend."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = StimulatorClient()
+    return _shared_client
+
+
+class SGCDaemonClient(BaseSGCConnector):
+    """Connector that forwards everything to the connector with the same name in the daemon."""
+
+    def __init__(self, name: str, client: Union[StimulatorClient, None] = None, intensity_codes_path: Union[Path, None] = None):
+        self.name = name
+        self.client = client or shared_client()
+        state = self.client.request("state")[name]
+        super().__init__(intensity_codes_path, start_intensity=state["intensity"])
+
+    def send_command(self, command: str):
+        self.client.request("send_bytes", self.name, command.encode("utf-8"))
+
+    def send_bytes(self, data: bytes):
+        self.client.request("send_bytes", self.name, data)
+
+    def send_pulse(self):
+        return self.client.request("send_pulse", self.name)
+
+    def change_intensity(self, target_intensity: float):
+        target_intensity = round(target_intensity, 1)
+        if target_intensity == self.current_intensity:
+            return
+        self.current_intensity = self.client.request("change_intensity", self.name, target_intensity)
+
+    def set_pulse_duration(self, duration=200):
+        self.client.request("set_pulse_duration", self.name, duration)
+
+    def set_trigger_delay(self, delay=0):
+        self.client.request("set_trigger_delay", self.name, delay)
+
+    def wakeup(self):
+        self.client.request("wakeup", self.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the SGC ports and NI trigger tasks open for a session.")
+    parser.add_argument("--shutdown", action="store_true", help="stop the running daemon instead of starting one")
+    args = parser.parse_args()
+
+    if args.shutdown:
+        StimulatorClient().shutdown()
+        raise SystemExit(0)
+
+    from .params import connectors
+    from . import triggers_nidaqmx
+
+    if connectors.backend == "daemon" or triggers_nidaqmx.USE_DAEMON:
+        raise SystemExit("The daemon itself needs a real, fake or emulator backend.")
+
+    try:
+        StimulatorDaemon(connectors).serve_forever()
+    finally:
+        connectors.close()
+        triggers_nidaqmx.close_tasks()
@@ -4,11 +4,22 @@ Description: Trigger interface using NI-DAQmx instead of parallel port.
 
 # -*- coding: utf-8 -*-
 
+import os
+import threading
 import time
 import platform
+from collections import deque
+
+import numpy as np
 
 USE_NIDAQ = platform.system() == "Windows"
 
+# skip the real pulse-width sleep of the mock backend (for fast simulated sessions)
+VIRTUAL_CLOCK = os.environ.get("CEREBELLOPM_VIRTUAL_CLOCK", "0") == "1"
+
+# forward triggers to a running utils.stimulator_daemon, which keeps the NI tasks open
+USE_DAEMON = os.environ.get("CEREBELLOPM_TRIGGER_BACKEND") == "daemon"
+
 if USE_NIDAQ:
     import nidaqmx
     from nidaqmx.constants import LineGrouping
@@ -18,21 +29,73 @@ if USE_NIDAQ:
 CHANNEL_OPM = "Dev1/port9/line0:7"   # All 8 lines of port 9
 CHANNEL_SQUID = "Dev1/port0/line0:7"  # All 8 lines of port 0
 PULSE_WIDTH = 0.02 # seconds (20 ms)
+SINGLE_TASK = True  # one DAQmx task spanning both ports, written in a single call
+NONBLOCKING = False  # lower the lines from a background thread instead of sleeping in setParallelData
+MIN_LOW_GAP = 0.005  # seconds the lines stay low between two queued non-blocking pulses
+MOCK_CAPACITY = 65536  # number of triggers the mock backend keeps in memory
+MOCK_VERBOSE = False  # also print every mock trigger
 # -------------------------
 
 
+class TriggerRecorder:
+    """
+    Preallocated ring buffer of (perf_counter time, code, pulse width) used by the mock backend.
+    Once full, the oldest triggers are overwritten.
+    """
+
+    DTYPE = np.dtype([("time", "f8"), ("code", "i4"), ("pulse_width", "f8")])
+
+    def __init__(self, capacity=MOCK_CAPACITY):
+        self.buffer = np.zeros(capacity, dtype=self.DTYPE)
+        self.n_recorded = 0
+
+    def record(self, timestamp, code, pulse_width):
+        i = self.n_recorded % len(self.buffer)
+        self.buffer[i] = (timestamp, code, pulse_width)
+        self.n_recorded += 1
+
+    def to_numpy(self):
+        """Recorded triggers in chronological order."""
+        capacity = len(self.buffer)
+        if self.n_recorded <= capacity:
+            return self.buffer[:self.n_recorded].copy()
+        start = self.n_recorded % capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def to_csv(self, path):
+        triggers = self.to_numpy()
+        np.savetxt(path, triggers, delimiter=",", fmt=["%.6f", "%d", "%.6f"], header="time,code,pulse_width", comments="")
+
+    def clear(self):
+        self.n_recorded = 0
+
+
+mock_recorder = TriggerRecorder()
+
+
 _trigger_task_OPM = None
 _trigger_task_SQUID = None
+_trigger_task_BOTH = None  # used instead of the two tasks above if SINGLE_TASK
 
 
 def _init_task():
     global _trigger_task_OPM
     global _trigger_task_SQUID
+    global _trigger_task_BOTH
 
-    if _trigger_task_OPM is not None and _trigger_task_SQUID is not None:
+    if _trigger_task_BOTH is not None or (_trigger_task_OPM is not None and _trigger_task_SQUID is not None):
         return
 
-    if USE_NIDAQ:
+    if USE_NIDAQ and SINGLE_TASK:
+        # one channel per port in the same task, so both ports are updated by one driver call
+        _trigger_task_BOTH = nidaqmx.Task(new_task_name="OPM and SQUID Trigger Task")
+        for channel in [CHANNEL_OPM, CHANNEL_SQUID]:
+            _trigger_task_BOTH.do_channels.add_do_chan(
+                channel,
+                line_grouping=LineGrouping.CHAN_FOR_ALL_LINES
+            )
+        print(f"[NI] Trigger task initialised on {CHANNEL_OPM} (OPM) and {CHANNEL_SQUID} (SQUID).")
+    elif USE_NIDAQ:
         _trigger_task_OPM = nidaqmx.Task(new_task_name="OPM Trigger Task")
         _trigger_task_OPM.do_channels.add_do_chan(
             CHANNEL_OPM,
@@ -51,29 +114,151 @@ def _init_task():
         _trigger_task_OPM = "MOCK"
         _trigger_task_SQUID = "MOCK"
 
-        
-def setParallelData(code=1):
+
+def _write(code):
+    if not USE_NIDAQ:
+        return
+    if _trigger_task_BOTH is not None:
+        _trigger_task_BOTH.write([code, code], auto_start=True)  # one value per port
+    else:
+        for task in [_trigger_task_OPM, _trigger_task_SQUID]:
+            task.write(code, auto_start=True)
+
+
+def setParallelData(code=1, blocking=None):
+    """
+    Raise the trigger lines to `code` for PULSE_WIDTH seconds. Returns the perf_counter time
+    of the rising edge, with every backend (including the daemon).
+
+    If blocking is False (default: not NONBLOCKING) the call returns right after the lines
+    have been raised, and a background thread lowers them again. A trigger requested while the previous one is
+    still high, or less than MIN_LOW_GAP after it was lowered, is queued and raised once
+    the lines have been low for MIN_LOW_GAP, so the acquisition system sees two separate
+    pulses; the return value is then the scheduled rise time.
+    """
+    if USE_DAEMON:
+        from .stimulator_daemon import shared_client
+        return shared_client().trigger(code)  # the daemon replies with the rise time
+
     _init_task()
 
+    if blocking is None:
+        blocking = not NONBLOCKING
+    if not blocking:
+        return _raise_nonblocking(code)
+
     if USE_NIDAQ:
-        for task in [_trigger_task_OPM, _trigger_task_SQUID]:
-            task.write(code, auto_start=True)  # Set lines to desired code without starting yet 
+        _write(code)  # Set lines to desired code
+        t = time.perf_counter()
         time.sleep(PULSE_WIDTH)
-
-        for task in [_trigger_task_OPM, _trigger_task_SQUID]:
-            task.write(0, auto_start=True)  # Reset lines to 0 after pulse width
+        _write(0)  # Reset lines to 0 after pulse width
     else:
         # Fake trigger behaviour
-        timestamp = time.perf_counter()
+        t = time.perf_counter()
+        _record_mock(code, t)
+        if not VIRTUAL_CLOCK:
+            time.sleep(PULSE_WIDTH)
+    return t
+
+
+def _record_mock(code, timestamp):
+    mock_recorder.record(timestamp, code, PULSE_WIDTH)
+    if MOCK_VERBOSE:
         print(f"[MOCK TRIGGER] {timestamp:.6f}  CODE={code}")
-        time.sleep(PULSE_WIDTH)
+
+
+def get_mock_triggers():
+    """Triggers recorded by the mock backend as a numpy structured array (time, code, pulse_width)."""
+    return mock_recorder.to_numpy()
+
+
+def export_mock_triggers(path):
+    """Write the triggers recorded by the mock backend to a CSV file."""
+    mock_recorder.to_csv(path)
+
+
+# ---- NON-BLOCKING TRIGGERS ----
+_pulse_cond = threading.Condition()
+_pending_codes: deque = deque()  # codes waiting for the current pulse to be lowered
+_high_until = None  # perf_counter time the current pulse should be lowered (None if lines are low)
+_low_since = float("-inf")  # perf_counter time the lines were last lowered
+_lowering_thread = None
+
+
+def _rise(code):
+    """Raise the lines and schedule lowering. Must be called with _pulse_cond held."""
+    global _high_until
+
+    _write(code)
+    t = time.perf_counter()
+    if not USE_NIDAQ:
+        _record_mock(code, t)
+    _high_until = t + PULSE_WIDTH
+    return t
+
+
+def _raise_nonblocking(code):
+    global _lowering_thread
+
+    with _pulse_cond:
+        if _lowering_thread is None:
+            _lowering_thread = threading.Thread(target=_lowering_loop, daemon=True)
+            _lowering_thread.start()
+
+        if _high_until is None and not _pending_codes and time.perf_counter() - _low_since >= MIN_LOW_GAP:
+            t = _rise(code)
+            _pulse_cond.notify()
+            return t
+
+        _pending_codes.append(code)
+        _pulse_cond.notify()
+        first_rise = (_low_since if _high_until is None else _high_until) + MIN_LOW_GAP
+        return first_rise + (PULSE_WIDTH + MIN_LOW_GAP) * (len(_pending_codes) - 1)
+
+
+def _lowering_loop():
+    global _high_until, _low_since
+
+    while True:
+        with _pulse_cond:
+            while _high_until is None and not _pending_codes:
+                _pulse_cond.wait()
+            # lower the current pulse, or raise the next queued one once the lines have been low long enough
+            due = _high_until if _high_until is not None else _low_since + MIN_LOW_GAP
+            remaining = due - time.perf_counter()
+
+        if remaining > 0:
+            time.sleep(remaining)
+
+        with _pulse_cond:
+            if _high_until is not None:
+                _write(0)
+                _high_until = None
+                _low_since = time.perf_counter()
+            elif _pending_codes and time.perf_counter() - _low_since >= MIN_LOW_GAP:
+                _rise(_pending_codes.popleft())
+            if _high_until is None and not _pending_codes:
+                _pulse_cond.notify_all()
+
+
+def wait_for_triggers(timeout=1.0):
+    """Block until all non-blocking trigger pulses have been lowered."""
+    with _pulse_cond:
+        return _pulse_cond.wait_for(lambda: _high_until is None and not _pending_codes, timeout=timeout)
 
 
 def close_tasks():
     global _trigger_task_OPM
     global _trigger_task_SQUID
+    global _trigger_task_BOTH
+
+    wait_for_triggers()
 
     if USE_NIDAQ:
+        if _trigger_task_BOTH is not None:
+            _trigger_task_BOTH.close()
+            _trigger_task_BOTH = None
+            print("[NI] OPM and SQUID trigger task closed.")
         if _trigger_task_OPM is not None:
             _trigger_task_OPM.close()
             _trigger_task_OPM = None